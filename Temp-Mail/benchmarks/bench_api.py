@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+End-to-end API benchmark for Smart TempMail
+Copyright @ISmartCoder
+Updates Channel https://t.me/abirxdhackz
+
+Starts the fake upstreams from fake_upstream.py, runs main:app under uvicorn
+against them, and drives /api/gen, /api/chk, /api/edu/gen and /api/edu/chk at
+several concurrency levels. Reports throughput and p50/p99 latency, saves the
+results as JSON and can compare them with an earlier run.
+
+Usage:
+  python benchmarks/bench_api.py
+  python benchmarks/bench_api.py --concurrency 1,16,64 --requests 500 --output after.json --compare before.json
+  MAILBOX_POOL_SIZE=0 python benchmarks/bench_api.py --endpoints gen --latency 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+
+import aiohttp
+from fake_upstream import add_arguments, from_arguments
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = {
+    "gen": ("/api/gen", None),
+    "chk": ("/api/chk", "gen"),
+    "edu_gen": ("/api/edu/gen", None),
+    "edu_chk": ("/api/edu/chk", "edu_gen")
+}
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+async def wait_ready(session: aiohttp.ClientSession, base_url: str, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API server exited with code {process.returncode}")
+        try:
+            async with session.get(f"{base_url}/api/stats") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError("API server did not become ready")
+
+async def issue_tokens(session: aiohttp.ClientSession, base_url: str, path: str, count: int) -> list:
+    tokens = []
+    for _ in range(count * 3):
+        async with session.get(f"{base_url}{path}") as response:
+            if response.status == 200:
+                tokens.append((await response.json())["access_token"])
+        if len(tokens) == count:
+            return tokens
+    raise RuntimeError(f"Could not issue {count} tokens from {path}")
+
+async def drive(session: aiohttp.ClientSession, url: str, tokens: list, concurrency: int, total: int) -> dict:
+    latencies = []
+    statuses = {}
+    issued = 0
+    async def worker():
+        nonlocal issued
+        while issued < total:
+            index = issued
+            issued += 1
+            params = {"token": tokens[index % len(tokens)]} if tokens else None
+            started = time.perf_counter()
+            try:
+                async with session.get(url, params=params) as response:
+                    await response.read()
+                    status = response.status
+            except aiohttp.ClientError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ok = statuses.get(200, 0)
+    return {
+        "requests": total,
+        "ok": ok,
+        "errors": total - ok,
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "throughput_rps": round(total / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2)
+    }
+
+async def run(args) -> dict:
+    upstream = from_arguments(args)
+    tempmail_url, etempmail_url = await upstream.start()
+    port = args.port or free_port()
+    env = dict(os.environ, TEMPMAIL_BASE_URL=tempmail_url, ETEMPMAIL_BASE_URL=etempmail_url,
+               KEEP_ALIVE_PORT=str(free_port()), LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING"))
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+               "--log-level", "warning", "--no-access-log"]
+    if args.workers > 1:
+        command += ["--workers", str(args.workers)]
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL if not args.verbose else None,
+                               stderr=subprocess.STDOUT if not args.verbose else None)
+    base_url = f"http://127.0.0.1:{port}"
+    results = []
+    try:
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=120)) as session:
+            await wait_ready(session, base_url, process)
+            tokens = {}
+            for endpoint in args.endpoints:
+                path, source = ENDPOINTS[endpoint]
+                if source and source not in tokens:
+                    tokens[source] = await issue_tokens(session, base_url, ENDPOINTS[source][0], args.tokens)
+            print(f"{'endpoint':<10}{'conc':>6}{'ok':>7}{'err':>6}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+            for endpoint in args.endpoints:
+                path, source = ENDPOINTS[endpoint]
+                for concurrency in args.concurrency:
+                    stats = await drive(session, f"{base_url}{path}", tokens.get(source, []), concurrency, args.requests)
+                    stats.update(endpoint=endpoint, concurrency=concurrency)
+                    results.append(stats)
+                    print(f"{endpoint:<10}{concurrency:>6}{stats['ok']:>7}{stats['errors']:>6}"
+                          f"{stats['throughput_rps']:>10.1f}{stats['p50_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        await upstream.stop()
+    return {
+        "created_at": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "verbose")},
+        "upstream": upstream.stats(),
+        "results": results
+    }
+
+def compare(current: dict, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(row["endpoint"], row["concurrency"]): row for row in json.load(f)["results"]}
+    print(f"\nCompared with {baseline_path}")
+    print(f"{'endpoint':<10}{'conc':>6}{'req/s':>24}{'p50 ms':>24}{'p99 ms':>24}")
+    for row in current["results"]:
+        before = baseline.get((row["endpoint"], row["concurrency"]))
+        if before is None:
+            continue
+        cells = []
+        for key in ("throughput_rps", "p50_ms", "p99_ms"):
+            change = (row[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            cells.append(f"{before[key]:.1f}->{row[key]:.1f} {change:+.0f}%")
+        print(f"{row['endpoint']:<10}{row['concurrency']:>6}{cells[0]:>24}{cells[1]:>24}{cells[2]:>24}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API against local fake upstreams")
+    parser.add_argument("--endpoints", type=lambda value: value.split(","), default=list(ENDPOINTS),
+                        help=f"Comma-separated subset of {','.join(ENDPOINTS)}")
+    parser.add_argument("--concurrency", type=lambda value: [int(part) for part in value.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and concurrency level")
+    parser.add_argument("--tokens", type=int, default=20, help="Mailboxes created up front for the check endpoints")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=0, help="API port (default: a free port)")
+    parser.add_argument("--output", help="Save the results as JSON to this file (default: print the table only)")
+    parser.add_argument("--compare", help="Earlier results file to compare with")
+    parser.add_argument("--verbose", action="store_true", help="Show API server output")
+    add_arguments(parser)
+    args = parser.parse_args()
+    unknown = [endpoint for endpoint in args.endpoints if endpoint not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoints: {','.join(unknown)}")
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Edu message body conversion benchmark for Smart TempMail
+Copyright @ISmartCoder
+Updates Channel https://t.me/abirxdhackz
+
+Measures CPU time per inbox check for a mailbox full of HTML newsletters:
+the BeautifulSoup parse previously done for every message on every check,
+the HTMLParser fast path on a cold cache, and repeat checks on a warm cache.
+
+Usage:
+  python benchmarks/bench_edu_body.py
+  python benchmarks/bench_edu_body.py --messages 30 --size-kb 80 --checks 20
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["ENABLE_KEEP_ALIVE"] = "false"
+
+from bs4 import BeautifulSoup
+from fixtures import marketing_email
+from main import TempMailService, html_to_text
+
+def legacy_check(service: TempMailService, token: str, inbox: list) -> list:
+    return [BeautifulSoup(mail['body'], 'html.parser').get_text().strip() for mail in inbox]
+
+def uncached_check(service: TempMailService, token: str, inbox: list) -> list:
+    return [html_to_text(mail['body']) for mail in inbox]
+
+def cached_check(service: TempMailService, token: str, inbox: list) -> list:
+    return [service.edu_body_text(token, service.edu_message_id(mail), mail['body']) for mail in inbox]
+
+def measure(func, service: TempMailService, inbox: list, checks: int) -> dict:
+    timings = []
+    for _ in range(checks):
+        started = time.process_time()
+        result = func(service, "bench-token", inbox)
+        timings.append(time.process_time() - started)
+    return {"result": result, "median_ms": statistics.median(timings) * 1000, "max_ms": max(timings) * 1000}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark edu message body conversion")
+    parser.add_argument("--messages", type=int, default=30, help="Messages in the mailbox")
+    parser.add_argument("--size-kb", type=int, default=60, help="Size of each HTML newsletter")
+    parser.add_argument("--checks", type=int, default=10, help="Inbox checks measured per path")
+    args = parser.parse_args()
+    inbox = [
+        {"from": f"news{index}@example.com", "subject": f"Issue {index}", "date": "2024-01-01",
+         "body": marketing_email(size_kb=args.size_kb, seed=index)}
+        for index in range(args.messages)
+    ]
+    service = TempMailService()
+    legacy = measure(legacy_check, service, inbox, args.checks)
+    uncached = measure(uncached_check, service, inbox, args.checks)
+    cached_check(service, "bench-token", inbox)
+    cached = measure(cached_check, service, inbox, args.checks)
+    for label, stats in (("htmlparser", uncached), ("cached", cached)):
+        if stats["result"] != legacy["result"]:
+            print(f"⚠️  {label}: text differs from BeautifulSoup output")
+    print(f"{args.messages} messages x {args.size_kb}KB per check")
+    print(f"{'path':<14}{'median ms/check':>17}{'max ms':>10}{'speedup':>10}")
+    for label, stats in (("beautifulsoup", legacy), ("htmlparser", uncached), ("cached", cached)):
+        print(f"{label:<14}{stats['median_ms']:>17.2f}{stats['max_ms']:>10.2f}"
+              f"{legacy['median_ms'] / max(stats['median_ms'], 0.001):>9.1f}x")
+    print(f"cache: {service.body_cache.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Landing page extraction benchmark for Smart TempMail
+Copyright @ISmartCoder
+Updates Channel https://t.me/abirxdhackz
+
+Compares the full BeautifulSoup parse previously used by generate_temp_mail
+with the precompiled raw-HTML extractor, on synthetic pages or captured ones.
+
+Usage:
+  python benchmarks/bench_extract.py
+  python benchmarks/bench_extract.py --page captured_landing.html --iterations 50
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["ENABLE_KEEP_ALIVE"] = "false"
+
+from bs4 import BeautifulSoup
+from fixtures import landing_page
+from main import TempMailService
+
+async def legacy_extract(service: TempMailService, html_content: str) -> tuple:
+    soup = BeautifulSoup(html_content, 'html.parser')
+    api_url = await service.extract_api_url_from_dom(soup)
+    email = await service.extract_email_from_dom(soup)
+    return api_url, email
+
+async def targeted_extract(service: TempMailService, html_content: str) -> tuple:
+    api_url = await service.extract_api_url(html_content)
+    email = await service.extract_email_from_html(html_content)
+    return api_url, email
+
+async def measure(func, service: TempMailService, html_content: str, iterations: int) -> dict:
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = await func(service, html_content)
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    await func(service, html_content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "result": result,
+        "median_ms": statistics.median(timings) * 1000,
+        "p99_ms": sorted(timings)[max(0, int(len(timings) * 0.99) - 1)] * 1000,
+        "peak_kb": peak / 1024
+    }
+
+async def run(pages: list, iterations: int):
+    service = TempMailService()
+    print(f"{'page':<28}{'size':>9}  {'path':<10}{'median ms':>11}{'p99 ms':>10}{'peak KB':>11}")
+    for name, html_content in pages:
+        legacy = await measure(legacy_extract, service, html_content, iterations)
+        targeted = await measure(targeted_extract, service, html_content, iterations)
+        if legacy["result"] != targeted["result"]:
+            print(f"⚠️  {name}: results differ: legacy={legacy['result']} targeted={targeted['result']}")
+        for label, stats in (("legacy", legacy), ("targeted", targeted)):
+            print(f"{name:<28}{len(html_content) // 1024:>7}KB  {label:<10}"
+                  f"{stats['median_ms']:>11.2f}{stats['p99_ms']:>10.2f}{stats['peak_kb']:>11.0f}")
+        print(f"{'':<28}{'':>9}  {'speedup':<10}{legacy['median_ms'] / targeted['median_ms']:>10.1f}x"
+              f"{'':>10}{legacy['peak_kb'] / max(targeted['peak_kb'], 1):>10.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark landing page extraction")
+    parser.add_argument("--page", action="append", default=[], help="Captured landing page HTML file (repeatable)")
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+    pages = []
+    for path in args.page:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            pages.append((os.path.basename(path), f.read()))
+    if not pages:
+        for size_kb in (50, 250, 750):
+            pages.append((f"synthetic-{size_kb}kb", landing_page(size_kb=size_kb, mailbox="demo@tempmail.dev")))
+    asyncio.run(run(pages, args.iterations))
+
+if __name__ == "__main__":
+    main()
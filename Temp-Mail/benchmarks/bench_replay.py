@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Replay benchmark for Smart TempMail
+Copyright @ISmartCoder
+Updates Channel https://t.me/abirxdhackz
+
+Benchmarks parsing and end-to-end service latency on upstream fixtures
+recorded with UPSTREAM_CAPTURE_DIR, served offline through ReplayTransport.
+With --capture-from-fake the fixtures are first recorded from the local fake
+upstreams, which is handy when no captured traffic is at hand.
+
+Usage:
+  UPSTREAM_CAPTURE_DIR=fixtures/live python main.py      # record real traffic, then:
+  python benchmarks/bench_replay.py --fixtures fixtures/live
+  python benchmarks/bench_replay.py --fixtures /tmp/fake-fixtures --capture-from-fake
+  python benchmarks/bench_replay.py --fixtures fixtures/live --latency-scale 1.0 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import base64
+import importlib
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ["ENABLE_KEEP_ALIVE"] = "false"
+
+from fake_upstream import FakeUpstream
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+async def capture_from_fake(directory: str, rounds: int):
+    upstream = FakeUpstream(latency=0.01, message_kb=40)
+    tempmail_url, etempmail_url = await upstream.start()
+    os.environ.update(TEMPMAIL_BASE_URL=tempmail_url, ETEMPMAIL_BASE_URL=etempmail_url)
+    main = importlib.import_module("main")
+    service = main.TempMailService()
+    service.recorder = main.UpstreamRecorder(directory)
+    try:
+        for index in range(rounds):
+            service.api_url_cache.invalidate()
+            result = await service.generate_temp_mail(ten_minute=index % 2 == 1)
+            await service.check_messages(result["access_token"])
+            result = await service.generate_edu_email()
+            await service.check_edu_messages(result["access_token"])
+    finally:
+        await service.stop()
+        await upstream.stop()
+    print(f"Captured {service.recorder.recorded} fixtures into {directory}")
+
+def load_fixtures(directory: str, phase: str) -> list:
+    fixtures = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                fixture = json.load(f)
+            if fixture["phase"] == phase and fixture["response"]["status_code"] == 200:
+                fixtures.append(fixture)
+    return fixtures
+
+def fixture_response(main, fixture: dict):
+    recorded = fixture["response"]
+    return main.TransportResponse(recorded["url"], recorded["status_code"],
+                                  main.requests.structures.CaseInsensitiveDict(recorded["headers"]),
+                                  base64.b64decode(recorded["body"]), recorded["cookies"])
+
+def timed(results: dict, label: str, started: float):
+    results.setdefault(label, []).append(time.perf_counter() - started)
+
+async def bench_parsing(main, service, directory: str, iterations: int):
+    results = {}
+    for fixture in load_fixtures(directory, "landing_page"):
+        response = fixture_response(main, fixture)
+        for _ in range(iterations):
+            started = time.perf_counter()
+            html_content = await service.decompress_response(response.text, response.headers)
+            timed(results, "landing: decompress", started)
+            started = time.perf_counter()
+            await service.extract_api_url(html_content)
+            timed(results, "landing: extract_api_url", started)
+            started = time.perf_counter()
+            await service.extract_auth_token(html_content, response.cookies)
+            timed(results, "landing: extract_auth_token", started)
+            started = time.perf_counter()
+            await service.extract_email_from_html(html_content)
+            timed(results, "landing: extract_email", started)
+    for fixture in load_fixtures(directory, "get_inbox"):
+        response = fixture_response(main, fixture)
+        for _ in range(iterations):
+            started = time.perf_counter()
+            inbox = service.decode_edu_json(response)
+            timed(results, "edu inbox: decode", started)
+            started = time.perf_counter()
+            for mail in inbox:
+                main.html_to_text(mail["body"])
+            timed(results, "edu inbox: html_to_text", started)
+    return results
+
+async def bench_service(main, service, concurrency: int, iterations: int) -> dict:
+    results = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    async def regular(ten_minute: bool):
+        async with semaphore:
+            started = time.perf_counter()
+            result = await service.generate_temp_mail(ten_minute=ten_minute)
+            timed(results, "generate_temp_mail", started)
+            started = time.perf_counter()
+            await service.check_messages(result["access_token"])
+            timed(results, "check_messages", started)
+    async def edu():
+        async with semaphore:
+            started = time.perf_counter()
+            result = await service.generate_edu_email()
+            timed(results, "generate_edu_email", started)
+            started = time.perf_counter()
+            await service.check_edu_messages(result["access_token"])
+            timed(results, "check_edu_messages", started)
+    started = time.perf_counter()
+    await asyncio.gather(*(regular(index % 2 == 1) for index in range(iterations)), *(edu() for _ in range(iterations)))
+    results["total"] = [time.perf_counter() - started]
+    return results
+
+def report(title: str, results: dict):
+    print(f"\n{title}")
+    print(f"{'operation':<30}{'count':>7}{'median ms':>11}{'p99 ms':>10}")
+    for label, timings in results.items():
+        print(f"{label:<30}{len(timings):>7}{statistics.median(timings) * 1000:>11.2f}{percentile(timings, 0.99) * 1000:>10.2f}")
+
+async def run(args):
+    if args.capture_from_fake:
+        await capture_from_fake(args.fixtures, args.capture_rounds)
+    main = importlib.import_module("main")
+    service = main.TempMailService()
+    service.recorder = None
+    service.replay = main.ReplayTransport(args.fixtures, args.latency_scale)
+    try:
+        print(f"Replaying {service.replay.stats()['fixtures']}")
+        report("Parsing on recorded payloads", await bench_parsing(main, service, args.fixtures, args.parse_iterations))
+        report(f"Service calls on replayed upstream (concurrency {args.concurrency}, latency x{args.latency_scale})",
+               await bench_service(main, service, args.concurrency, args.iterations))
+        print(f"\nreplay: served {service.replay.served}, misses {service.replay.misses}")
+    finally:
+        await service.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parsing and service latency on replayed upstream fixtures")
+    parser.add_argument("--fixtures", required=True, help="Directory of fixtures recorded with UPSTREAM_CAPTURE_DIR")
+    parser.add_argument("--capture-from-fake", action="store_true", help="Record fixtures from the local fake upstreams first")
+    parser.add_argument("--capture-rounds", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=50, help="Generate-and-check rounds per mailbox type")
+    parser.add_argument("--parse-iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-scale", type=float, default=0.0, help="Replay recorded latency multiplied by this factor")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
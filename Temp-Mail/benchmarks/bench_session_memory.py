@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Session memory benchmark for Smart TempMail
+Copyright @ISmartCoder
+Updates Channel https://t.me/abirxdhackz
+
+Compares bytes per session for the legacy dict that carried a cloudscraper
+session, a plain dict of the same fields, and the slotted SessionRecord.
+Scrapers are expensive to build, so that layout is measured on a sample and
+extrapolated to the requested session count.
+
+Usage:
+  python benchmarks/bench_session_memory.py
+  python benchmarks/bench_session_memory.py --sessions 100000 --scraper-sample 500
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["ENABLE_KEEP_ALIVE"] = "false"
+
+import cloudscraper
+from main import SessionRecord, SessionStore
+
+API_URL = "https://web2.temp-mail.org"
+
+def fields(index: int) -> tuple:
+    email = f"user{index:07d}@tempmail.dev"
+    cookies = {"cf_clearance": uuid.uuid4().hex * 3, "__cf_bm": uuid.uuid4().hex * 2}
+    return email, cookies, time.time()
+
+def legacy_session(index: int) -> tuple:
+    email, cookies, created_at = fields(index)
+    return str(uuid.uuid4()), {
+        'api_url': API_URL,
+        'email': email,
+        'cookies': cookies,
+        'created_at': created_at,
+        'ten_minute': False,
+        'scraper': cloudscraper.create_scraper()
+    }
+
+def dict_session(index: int) -> tuple:
+    email, cookies, created_at = fields(index)
+    return str(uuid.uuid4()), {
+        'api_url': API_URL,
+        'email': email,
+        'cookies': cookies,
+        'created_at': created_at,
+        'ten_minute': False
+    }
+
+def record_session(index: int) -> tuple:
+    email, cookies, created_at = fields(index)
+    return str(uuid.uuid4()), SessionRecord(email, API_URL, cookies, created_at, 'regular')
+
+def measure(factory, count: int, store: bool = False) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    if store:
+        sessions = SessionStore('bench', 3600, capacity=count)
+        for index in range(count):
+            token, session = factory(index)
+            sessions.cache(token, session, session.created_at + 3600)
+    else:
+        sessions = dict(factory(index) for index in range(count))
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del sessions
+    gc.collect()
+    return (after - before) / count
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-session memory")
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--scraper-sample", type=int, default=200, help="Legacy sessions actually built before extrapolating")
+    args = parser.parse_args()
+    rows = [
+        ("dict + cloudscraper", measure(legacy_session, args.scraper_sample), f"sampled {args.scraper_sample}"),
+        ("dict", measure(dict_session, args.sessions), "measured"),
+        ("SessionRecord", measure(record_session, args.sessions), "measured"),
+        ("SessionRecord in store", measure(record_session, args.sessions, store=True), "measured")
+    ]
+    baseline = rows[0][1]
+    print(f"{'layout':<26}{'bytes/session':>15}{f'MB @ {args.sessions}':>16}{'vs legacy':>12}  source")
+    for label, per_session, source in rows:
+        print(f"{label:<26}{per_session:>15.0f}{per_session * args.sessions / 1024 / 1024:>16.1f}"
+              f"{baseline / per_session:>11.1f}x  {source}")
+
+if __name__ == "__main__":
+    main()
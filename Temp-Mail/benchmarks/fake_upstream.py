@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Local stand-in upstreams for Smart TempMail benchmarks
+Copyright @ISmartCoder
+Updates Channel https://t.me/abirxdhackz
+
+Serves a fake temp-mail.org (landing page with an encoded api_url, /mailbox,
+/messages) and a fake etempmail (/getEmailAddress, /getInbox) with
+configurable latency, error rate and payload sizes. Point the API at them with
+TEMPMAIL_BASE_URL and ETEMPMAIL_BASE_URL.
+
+Usage:
+  python benchmarks/fake_upstream.py
+  python benchmarks/fake_upstream.py --latency 0.08 --error-rate 0.02 --messages 20 --message-kb 60
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+from fixtures import landing_page, marketing_email, random_words
+
+class FakeUpstream:
+    def __init__(self, latency: float = 0.05, jitter: float = 0.5, error_rate: float = 0.0, landing_kb: int = 250,
+                 messages: int = 5, message_kb: int = 20, seed: int = 1):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.landing_kb = landing_kb
+        self.messages = messages
+        self.message_kb = message_kb
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.requests = {}
+        self.errors = 0
+        self.runners = []
+        self.tempmail_url = None
+        self.etempmail_url = None
+        self.landing = None
+        self.inbox = None
+        self.edu_inbox = None
+
+    @web.middleware
+    async def simulate(self, request: web.Request, handler):
+        self.requests[request.path] = self.requests.get(request.path, 0) + 1
+        delay = self.latency * (1 + self.rng.uniform(-self.jitter, self.jitter))
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.rng.random() < self.error_rate:
+            self.errors += 1
+            return web.Response(status=503, text="upstream unavailable")
+        return await handler(request)
+
+    def build_payloads(self):
+        self.landing = landing_page(api_url=self.tempmail_url, size_kb=self.landing_kb, seed=self.seed)
+        now = int(time.time())
+        self.inbox = json.dumps({"messages": [
+            {
+                "_id": f"msg{index:04d}",
+                "receivedAt": now - index * 60,
+                "from": f"sender{index}@example.com",
+                "subject": random_words(self.rng, 6),
+                "bodyPreview": random_words(self.rng, self.message_kb * 1024 // 7),
+                "attachmentsCount": 0
+            }
+            for index in range(self.messages)
+        ]})
+        self.edu_inbox = json.dumps([
+            {
+                "from": f"news{index}@example.com",
+                "subject": random_words(self.rng, 6),
+                "date": time.strftime('%Y-%m-%d %H:%M:%S'),
+                "body": marketing_email(size_kb=self.message_kb, seed=self.seed + index)
+            }
+            for index in range(self.messages)
+        ])
+
+    async def landing_handler(self, request: web.Request):
+        response = web.Response(text=self.landing, content_type="text/html")
+        response.set_cookie("XSRF-TOKEN", uuid.uuid4().hex)
+        return response
+
+    async def mailbox_handler(self, request: web.Request):
+        claims = base64.urlsafe_b64encode(json.dumps({"sub": uuid.uuid4().hex}).encode()).decode().rstrip('=')
+        return web.json_response({
+            "mailbox": f"{uuid.uuid4().hex[:12]}@fake-tempmail.test",
+            "token": f"eyJhbGciOiJIUzI1NiJ9.{claims}.{uuid.uuid4().hex}"
+        })
+
+    async def messages_handler(self, request: web.Request):
+        if not request.headers.get("Authorization", "").startswith("Bearer eyJ"):
+            return web.json_response({"error": "unauthorized"}, status=401)
+        return web.Response(text=self.inbox, content_type="application/json")
+
+    async def email_address_handler(self, request: web.Request):
+        response = web.json_response({
+            "address": f"{uuid.uuid4().hex[:12]}@fake-edu.test",
+            "recover_key": uuid.uuid4().hex
+        })
+        response.set_cookie("ci_session", uuid.uuid4().hex)
+        return response
+
+    async def inbox_handler(self, request: web.Request):
+        return web.Response(text=self.edu_inbox, content_type="application/json")
+
+    async def serve(self, app: web.Application, host: str, port: int) -> str:
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        self.runners.append(runner)
+        bound_port = runner.addresses[0][1]
+        return f"http://{host}:{bound_port}"
+
+    async def start(self, host: str = "127.0.0.1", tempmail_port: int = 0, etempmail_port: int = 0) -> tuple:
+        tempmail = web.Application(middlewares=[self.simulate])
+        tempmail.router.add_get("/en/", self.landing_handler)
+        tempmail.router.add_get("/en/10minutemail", self.landing_handler)
+        tempmail.router.add_post("/mailbox", self.mailbox_handler)
+        tempmail.router.add_get("/mailbox", self.mailbox_handler)
+        tempmail.router.add_get("/messages", self.messages_handler)
+        etempmail = web.Application(middlewares=[self.simulate])
+        etempmail.router.add_post("/getEmailAddress", self.email_address_handler)
+        etempmail.router.add_post("/getInbox", self.inbox_handler)
+        self.tempmail_url = await self.serve(tempmail, host, tempmail_port)
+        self.etempmail_url = await self.serve(etempmail, host, etempmail_port)
+        self.build_payloads()
+        return self.tempmail_url, self.etempmail_url
+
+    async def stop(self):
+        for runner in self.runners:
+            await runner.cleanup()
+        self.runners = []
+
+    def stats(self) -> dict:
+        return {"requests": dict(self.requests), "injected_errors": self.errors}
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean upstream latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.5, help="Latency spread as a fraction of --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of upstream requests answered with 503")
+    parser.add_argument("--landing-kb", type=int, default=250, help="Landing page size")
+    parser.add_argument("--messages", type=int, default=5, help="Messages in every inbox")
+    parser.add_argument("--message-kb", type=int, default=20, help="Size of each message body")
+
+def from_arguments(args) -> FakeUpstream:
+    return FakeUpstream(args.latency, args.jitter, args.error_rate, args.landing_kb, args.messages, args.message_kb)
+
+async def run(args):
+    upstream = from_arguments(args)
+    tempmail_url, etempmail_url = await upstream.start(args.host, args.tempmail_port, args.etempmail_port)
+    print(f"TEMPMAIL_BASE_URL={tempmail_url}")
+    print(f"ETEMPMAIL_BASE_URL={etempmail_url}")
+    try:
+        while True:
+            await asyncio.sleep(30)
+            print(f"upstream: {upstream.stats()}")
+    finally:
+        await upstream.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run fake temp-mail.org and etempmail servers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--tempmail-port", type=int, default=18001)
+    parser.add_argument("--etempmail-port", type=int, default=18002)
+    add_arguments(parser)
+    try:
+        asyncio.run(run(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
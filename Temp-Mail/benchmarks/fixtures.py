@@ -0,0 +1,77 @@
+# Synthetic upstream payloads for Smart TempMail benchmarks
+# Copyright @ISmartCoder
+# Updates Channel https://t.me/abirxdhackz
+
+import base64
+import random
+import string
+
+def encode_api_url(api_url: str) -> str:
+    """Encode an API URL the way temp-mail.org embeds it in the landing page"""
+    return base64.b64encode(api_url.encode()).decode().replace('6', 'f56')
+
+def random_words(rng: random.Random, count: int) -> str:
+    return ' '.join(
+        ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+        for _ in range(count)
+    )
+
+def landing_page(api_url: str = "https://web2.temp-mail.org", size_kb: int = 250,
+                 mailbox: str = "", seed: int = 1) -> str:
+    """Build a landing page shaped like temp-mail.org: head scripts, large body, api_url script near the end"""
+    rng = random.Random(seed)
+    head = [
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">',
+        '<title>Temp Mail - Disposable Temporary Email</title>',
+    ]
+    for index in range(20):
+        head.append(f'<link rel="preload" href="/assets/chunk-{index}.js" as="script">')
+        head.append(f'<script>window.__chunk{index} = {{"id": {index}, "name": "{random_words(rng, 3)}"}};</script>')
+    body = [
+        '</head><body><div class="container"><header class="navbar">',
+        f'<input id="mail" type="text" class="emailbox-input" value="{mailbox}" readonly>',
+        '</header><main>'
+    ]
+    target = size_kb * 1024
+    size = sum(len(part) for part in head + body)
+    index = 0
+    while size < target:
+        block = (
+            f'<section class="faq-item" id="faq-{index}"><h3>{random_words(rng, 6)}</h3>'
+            f'<p>{random_words(rng, 60)}</p><ul>'
+            + ''.join(f'<li><a href="/en/blog/{index}-{n}">{random_words(rng, 4)}</a></li>' for n in range(5))
+            + '</ul></section>'
+        )
+        body.append(block)
+        size += len(block)
+        index += 1
+    body.append('</main><footer><p>Contact: support@temp-mail.org</p></footer></div>')
+    body.append(f"<script>var api_url = '{encode_api_url(api_url)}'; var locale = 'en';</script>")
+    body.append('<script src="/assets/app.js" defer></script></body></html>')
+    return ''.join(head + body)
+
+def marketing_email(size_kb: int = 60, seed: int = 1) -> str:
+    """Build a table-heavy HTML newsletter with inline styles, a style block and tracking pixels"""
+    rng = random.Random(seed)
+    parts = [
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><style type="text/css">',
+        ''.join(f'.c{n} {{ color: #{rng.randrange(0x1000000):06x}; padding: {n}px; }}' for n in range(80)),
+        '</style></head><body style="margin:0;padding:0"><!-- preheader -->',
+        '<table width="100%" cellpadding="0" cellspacing="0" border="0"><tr><td align="center">'
+    ]
+    target = size_kb * 1024
+    size = sum(len(part) for part in parts)
+    index = 0
+    while size < target:
+        row = (
+            f'<tr><td class="c{index % 80}" style="font-family:Arial,sans-serif;font-size:14px;line-height:20px">'
+            f'<h2 style="margin:0">{random_words(rng, 5)}</h2>'
+            f'<p>{random_words(rng, 40)} &amp; {random_words(rng, 10)} &nbsp;&#8212;</p>'
+            f'<a href="https://example.com/track?id={index}" style="color:#0066cc">Read more</a>'
+            f'<img src="https://example.com/pixel/{index}.gif" width="1" height="1" alt=""></td></tr>'
+        )
+        parts.append(row)
+        size += len(row)
+        index += 1
+    parts.append('</td></tr></table><script>trackOpen();</script></body></html>')
+    return ''.join(parts)
@@ -1,34 +1,1951 @@
 #Copyright @ISmartCoder
 #Updates Channel https://t.me/abirxdhackz
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse, FileResponse  
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, PlainTextResponse  
 from fastapi.staticfiles import StaticFiles  
+from pydantic import BaseModel, Field
 import asyncio
 import aiohttp
 import socket
 import time
 import re
 import base64
+import html
 import json
+import queue
+import sqlite3
+import heapq
 import gzip
+import hashlib
 import brotli
 import zstandard as zstd
 import cloudscraper
 from bs4 import BeautifulSoup
-from typing import Optional, Dict, Any
+from html.parser import HTMLParser
+from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from abc import ABC, abstractmethod
+from collections import deque, OrderedDict
 import threading
 import uuid
 import os
+import sys
+import random
+import requests
+from urllib.parse import urlsplit
+import atexit
+import bisect
+import logging
+from logging.handlers import QueueHandler, QueueListener
 from keep_alive import keep_alive
-keep_alive()
+try:
+    import redis
+except ImportError:
+    redis = None
 
-app = FastAPI(title="Smart TempMail API", version="1.0.0")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", 0.01))
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", 2000))
+
+def configure_logging() -> logging.Logger:
+    logger = logging.getLogger("tempmail")
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+    if not logger.handlers:
+        log_queue = queue.SimpleQueue()
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+        logger.addHandler(QueueHandler(log_queue))
+    for entry in filter(None, (part.strip() for part in LOG_LEVELS.split(','))):
+        name, _, level = entry.partition('=')
+        logging.getLogger(f"tempmail.{name.strip()}").setLevel(level.strip().upper())
+    return logger
+
+def log_payload(logger: logging.Logger, label: str, payload):
+    if not logger.isEnabledFor(logging.DEBUG) or random.random() >= LOG_PAYLOAD_SAMPLE_RATE:
+        return
+    text = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+    logger.debug("%s (%d chars): %s", label, len(text), text[:LOG_PAYLOAD_MAX_CHARS])
+
+configure_logging()
+upstream_logger = logging.getLogger("tempmail.upstream")
+pool_logger = logging.getLogger("tempmail.pools")
+session_logger = logging.getLogger("tempmail.sessions")
+inbox_logger = logging.getLogger("tempmail.inbox")
+api_logger = logging.getLogger("tempmail.api")
+
+WORKERS = int(os.getenv("WORKERS", 1))
+ENABLE_KEEP_ALIVE = os.getenv("ENABLE_KEEP_ALIVE", "false").lower() == "true"
+if ENABLE_KEEP_ALIVE and (__name__ == "__main__" or WORKERS <= 1):
+    keep_alive()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await temp_mail_service.start()
+    if SESSION_BACKEND == 'memory' and server_workers() > 1:
+        session_logger.warning("%d server workers with in-memory sessions: each worker only knows the tokens it issued. "
+                               "Set SESSION_DB_PATH or SESSION_REDIS_URL to share them", server_workers())
+    cleanup_task = asyncio.create_task(cleanup_expired_sessions())
+    try:
+        yield
+    finally:
+        cleanup_task.cancel()
+        await asyncio.gather(cleanup_task, return_exceptions=True)
+        await temp_mail_service.stop()
+
+app = FastAPI(title="Smart TempMail API", version="1.0.0", lifespan=lifespan)
+
+UPSTREAM_WORKERS = int(os.getenv("UPSTREAM_WORKERS", 64))
+MAILBOX_POOL_SIZE = int(os.getenv("MAILBOX_POOL_SIZE", 5))
+MAILBOX_POOL_MAX_AGE = float(os.getenv("MAILBOX_POOL_MAX_AGE", 1800))
+TEN_MINUTE_POOL_SIZE = int(os.getenv("TEN_MINUTE_POOL_SIZE", 3))
+TEN_MINUTE_POOL_MAX_AGE = float(os.getenv("TEN_MINUTE_POOL_MAX_AGE", 90))
+EDU_POOL_SIZE = int(os.getenv("EDU_POOL_SIZE", 5))
+EDU_POOL_MAX_AGE = float(os.getenv("EDU_POOL_MAX_AGE", 600))
+POOL_REFILL_CONCURRENCY = int(os.getenv("POOL_REFILL_CONCURRENCY", 2))
+SCRAPER_POOL_SIZE = int(os.getenv("SCRAPER_POOL_SIZE", 16))
+SCRAPER_MAX_USES = int(os.getenv("SCRAPER_MAX_USES", 500))
+SCRAPER_MAX_AGE = float(os.getenv("SCRAPER_MAX_AGE", 1800))
+SCRAPER_WARM_SIZE = int(os.getenv("SCRAPER_WARM_SIZE", 2))
+API_TRANSPORT = os.getenv("API_TRANSPORT", "aiohttp").lower()
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", 200))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 64))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 30))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 10))
+UPSTREAM_CAPTURE_DIR = os.getenv("UPSTREAM_CAPTURE_DIR", "")
+UPSTREAM_REPLAY_DIR = os.getenv("UPSTREAM_REPLAY_DIR", "")
+UPSTREAM_REPLAY_LATENCY = float(os.getenv("UPSTREAM_REPLAY_LATENCY", 0))
+INBOX_CACHE_TTL = float(os.getenv("INBOX_CACHE_TTL", 1.0))
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", 2.0))
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", 30.0))
+POLL_FAST_WINDOW = float(os.getenv("POLL_FAST_WINDOW", 120))
+POLL_BACKOFF = float(os.getenv("POLL_BACKOFF", 1.5))
+POLL_JITTER = float(os.getenv("POLL_JITTER", 0.1))
+POLL_MAX_RPS = float(os.getenv("POLL_MAX_RPS", 20))
+LONG_POLL_DEFAULT_TIMEOUT = float(os.getenv("LONG_POLL_DEFAULT_TIMEOUT", 30))
+LONG_POLL_MAX_TIMEOUT = float(os.getenv("LONG_POLL_MAX_TIMEOUT", 120))
+STREAM_HEARTBEAT_INTERVAL = float(os.getenv("STREAM_HEARTBEAT_INTERVAL", 15))
+INBOX_TRACKER_MAX_TOKENS = int(os.getenv("INBOX_TRACKER_MAX_TOKENS", 100000))
+LATEST_CURSOR = "latest"
+EDU_BODY_CACHE_CHARS = int(os.getenv("EDU_BODY_CACHE_CHARS", 16000000))
+SESSION_TTL = float(os.getenv("SESSION_TTL", 7200))
+TEN_MINUTE_SESSION_TTL = float(os.getenv("TEN_MINUTE_SESSION_TTL", 1500))
+EDU_SESSION_TTL = float(os.getenv("EDU_SESSION_TTL", 7200))
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", 100000))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", 60))
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))
+BATCH_MAX_COUNT = int(os.getenv("BATCH_MAX_COUNT", 50))
+BATCH_CHECK_CONCURRENCY = int(os.getenv("BATCH_CHECK_CONCURRENCY", 32))
+BATCH_CHECK_MAX_TOKENS = int(os.getenv("BATCH_CHECK_MAX_TOKENS", 500))
+RACE_PROVIDERS = os.getenv("RACE_PROVIDERS", "tempmail,etempmail")
+PROVIDER_FAILURE_THRESHOLD = int(os.getenv("PROVIDER_FAILURE_THRESHOLD", 3))
+PROVIDER_COOLDOWN = float(os.getenv("PROVIDER_COOLDOWN", 60))
+PROVIDER_RACE_WINDOW = float(os.getenv("PROVIDER_RACE_WINDOW", 10))
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "")
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "")
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "redis" if SESSION_REDIS_URL else "sqlite" if SESSION_DB_PATH else "memory")
+SESSION_SHARED = os.getenv("SESSION_SHARED", "true" if WORKERS > 1 else "false").lower() == "true"
+SESSION_DB_BATCH_SIZE = int(os.getenv("SESSION_DB_BATCH_SIZE", 200))
+SESSION_DB_FLUSH_INTERVAL = float(os.getenv("SESSION_DB_FLUSH_INTERVAL", 0.05))
+SESSION_DB_BUSY_TIMEOUT = float(os.getenv("SESSION_DB_BUSY_TIMEOUT", 5))
+API_URL_TTL = float(os.getenv("API_URL_TTL", 3600))
+TEMPMAIL_BASE_URL = os.getenv("TEMPMAIL_BASE_URL", "https://temp-mail.org").rstrip('/')
+ETEMPMAIL_BASE_URL = os.getenv("ETEMPMAIL_BASE_URL", "https://etempmail.com").rstrip('/')
+TEMPMAIL_HOST = urlsplit(TEMPMAIL_BASE_URL).netloc
+ETEMPMAIL_HOST = urlsplit(ETEMPMAIL_BASE_URL).netloc
+CLEARANCE_COOKIES = ('cf_clearance', '__cf_bm', '_cfuvid')
+BROWSER_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36'
+CHROME_CLIENT_HINTS = {
+    'Sec-Ch-Ua': '"Chromium";v="140", "Not=A?Brand";v="24", "Google Chrome";v="140"',
+    'Sec-Ch-Ua-Mobile': '?0',
+    'Sec-Ch-Ua-Platform': '"Windows"'
+}
+
+def tempmail_page_headers() -> dict:
+    return {
+        'User-Agent': BROWSER_USER_AGENT,
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept-Encoding': 'gzip, deflate, br, zstd',
+        **CHROME_CLIENT_HINTS,
+        'Sec-Fetch-Dest': 'document',
+        'Sec-Fetch-Mode': 'navigate',
+        'Sec-Fetch-Site': 'none',
+        'Sec-Fetch-User': '?1',
+        'Upgrade-Insecure-Requests': '1',
+        'Priority': 'u=0, i'
+    }
+
+def tempmail_api_headers(ten_minute: bool, cookies: dict, accept: str = '*/*', auth_token: Optional[str] = None,
+                         json_body: bool = False) -> dict:
+    headers = {
+        'User-Agent': BROWSER_USER_AGENT,
+        'Accept': accept,
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept-Encoding': 'gzip, deflate, br, zstd',
+        'Origin': TEMPMAIL_BASE_URL,
+        'Referer': f'{TEMPMAIL_BASE_URL}/en/10minutemail' if ten_minute else f'{TEMPMAIL_BASE_URL}/en/',
+        **CHROME_CLIENT_HINTS,
+        'Sec-Fetch-Dest': 'empty',
+        'Sec-Fetch-Mode': 'cors',
+        'Sec-Fetch-Site': 'same-site'
+    }
+    if json_body:
+        headers['Content-Type'] = 'application/json'
+    headers['Priority'] = 'u=1, i'
+    if auth_token:
+        headers['Authorization'] = f'Bearer {auth_token}'
+    if 'XSRF-TOKEN' in cookies:
+        headers['X-XSRF-TOKEN'] = cookies['XSRF-TOKEN']
+    return headers
+
+def etempmail_headers() -> dict:
+    return {
+        'accept': '*/*',
+        'accept-encoding': 'gzip, deflate, br',
+        'accept-language': 'en-US,en;q=0.6',
+        'origin': ETEMPMAIL_BASE_URL,
+        'referer': f'{ETEMPMAIL_BASE_URL}/',
+        'sec-ch-ua': '"Chromium";v="140", "Not=A?Brand";v="24", "Brave";v="140"',
+        'sec-ch-ua-mobile': '?0',
+        'sec-ch-ua-platform': '"Windows"',
+        'sec-fetch-dest': 'empty',
+        'sec-fetch-mode': 'cors',
+        'sec-fetch-site': 'same-origin',
+        'sec-gpc': '1',
+        'user-agent': BROWSER_USER_AGENT,
+        'x-requested-with': 'XMLHttpRequest'
+    }
+
+API_URL_PATTERNS = [
+    r"var api_url\s*=\s*'([^']+)'",
+    r'"api_url"\s*:\s*"([^"]+)"',
+    r'apiUrl\s*:\s*[\'"]([^\'"]+)[\'"]',
+    r'API_URL\s*=\s*[\'"]([^\'"]+)[\'"]'
+]
+API_URL_PATTERN = re.compile('|'.join(f'(?:{pattern})' for pattern in API_URL_PATTERNS))
+COMPILED_API_URL_PATTERNS = [re.compile(pattern) for pattern in API_URL_PATTERNS]
+JWT_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'"jwt"\s*:\s*"(eyJ[A-Za-z0-9_-]+(?:\.[A-Za-z0-9_-]+)*\.[A-Za-z0-9_-]+)"',
+    r'"token"\s*:\s*"(eyJ[A-Za-z0-9_-]+(?:\.[A-Za-z0-9_-]+)*\.[A-Za-z0-9_-]+)"',
+    r'window\.token\s*=\s*[\'"]eyJ[A-Za-z0-9_-]+(?:\.[A-Za-z0-9_-]+)*\.[A-Za-z0-9_-]+[\'"]',
+    r'eyJ[A-Za-z0-9_-]+(?:\.[A-Za-z0-9_-]+)*\.[A-Za-z0-9_-]+'
+)]
+EMAIL_PATTERN = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+')
+EMAIL_CONTAINER_CLASS_PATTERN = re.compile('email|mailbox|address|temp-mail', re.I)
+MAIL_INPUT_PATTERN = re.compile(r'<input\b[^>]*?\b(?:id|name)\s*=\s*["\']mail["\'][^>]*>', re.I)
+VALUE_ATTR_PATTERN = re.compile(r'\bvalue\s*=\s*(?:"([^"]*)"|\'([^\']*)\')', re.I)
+MAIL_SPAN_PATTERN = re.compile(r'<span\b[^>]*?\bid\s*=\s*["\']mail["\'][^>]*>([^<]*)<', re.I)
+
+def format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, format_labels(self.labelnames, labels), value
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), collect=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.collect = collect
+
+    def samples(self):
+        for labels, value in self.collect().items():
+            yield self.name, format_labels(self.labelnames, labels), value
+
+class Histogram:
+    kind = "histogram"
+    default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = default_buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.values = {}
+
+    def observe(self, *labels, value: float):
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def samples(self):
+        bucket_names = self.labelnames + ("le",)
+        for labels, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket", format_labels(bucket_names, labels + (le,)), cumulative
+            yield f"{self.name}_sum", format_labels(self.labelnames, labels), total
+            yield f"{self.name}_count", format_labels(self.labelnames, labels), count
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = (), collect=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, collect))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = Histogram.default_buckets) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+http_requests_total = metrics.counter(
+    "tempmail_http_requests_total", "HTTP requests handled, by method, route and status", ("method", "route", "status")
+)
+http_request_duration = metrics.histogram(
+    "tempmail_http_request_duration_seconds", "HTTP request latency until the response starts", ("method", "route")
+)
+upstream_requests_total = metrics.counter(
+    "tempmail_upstream_requests_total", "Upstream calls after retries, by provider, phase and final status", ("provider", "phase", "status")
+)
+upstream_request_duration = metrics.histogram(
+    "tempmail_upstream_request_duration_seconds", "Upstream call latency including retries", ("provider", "phase")
+)
+
+class UpstreamExecutor:
+    def __init__(self, max_workers: int = UPSTREAM_WORKERS):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upstream")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _call(self, func, args, kwargs):
+        with self._lock:
+            self.queued -= 1
+            self.in_flight += 1
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+
+    def _on_done(self, future):
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    async def run(self, func, *args, **kwargs):
+        with self._lock:
+            self.queued += 1
+        future = self._pool.submit(self._call, func, args, kwargs)
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self.queued,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "failed": self.failed
+            }
+
+class UpstreamResponseError(Exception):
+    def __init__(self, message: str, response=None):
+        super().__init__(message)
+        self.response = response
+
+class UpstreamRetryError(UpstreamResponseError):
+    pass
+
+class RetryPolicy:
+    def __init__(self, attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0, jitter: float = 0.5,
+                 timeout: float = 20.0, retry_statuses: tuple = (408, 425, 429, 500, 502, 503, 504)):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.timeout = timeout
+        self.retry_statuses = frozenset(retry_statuses)
+
+    @classmethod
+    def from_env(cls, prefix: str, **defaults) -> "RetryPolicy":
+        def env(name, cast, default):
+            value = os.getenv(f"{prefix}_RETRY_{name}")
+            return cast(value) if value is not None else default
+        policy = cls(**defaults)
+        statuses = os.getenv(f"{prefix}_RETRY_STATUSES")
+        return cls(
+            attempts=env("ATTEMPTS", int, policy.attempts),
+            base_delay=env("BASE_DELAY", float, policy.base_delay),
+            max_delay=env("MAX_DELAY", float, policy.max_delay),
+            jitter=env("JITTER", float, policy.jitter),
+            timeout=env("TIMEOUT", float, policy.timeout),
+            retry_statuses=tuple(int(code) for code in statuses.split(',') if code.strip()) if statuses else tuple(policy.retry_statuses)
+        )
+
+    def is_retryable_status(self, status_code: int) -> bool:
+        return status_code in self.retry_statuses
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * (1 - self.jitter) + random.uniform(0, delay * self.jitter)
+
+    async def run(self, attempt_func, description: str = "upstream call"):
+        for attempt in range(self.attempts):
+            try:
+                return await asyncio.wait_for(attempt_func(), timeout=self.timeout)
+            except (UpstreamRetryError, asyncio.TimeoutError, requests.RequestException, ConnectionError) as e:
+                if attempt + 1 >= self.attempts:
+                    raise
+                delay = self.backoff(attempt)
+                upstream_logger.info("%s attempt %d/%d failed (%s: %s), retrying in %.2fs",
+                                    description, attempt + 1, self.attempts, type(e).__name__, e, delay)
+                await asyncio.sleep(delay)
+
+class WarmPool:
+    def __init__(self, name: str, factory, target_size: int, max_age: float,
+                 refill_concurrency: int = POOL_REFILL_CONCURRENCY, refill_interval: float = 5.0):
+        self.name = name
+        self.factory = factory
+        self.target_size = max(0, target_size)
+        self.max_age = max_age
+        self.refill_concurrency = max(1, refill_concurrency)
+        self.refill_interval = refill_interval
+        self.items = deque()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.refills = 0
+        self.refill_failures = 0
+        self.consecutive_failures = 0
+        self.last_refill_latency = 0.0
+        self.max_refill_latency = 0.0
+        self.total_refill_latency = 0.0
+        self._refilling = set()
+        self._wake = None
+        self._task = None
+
+    def evict_stale(self):
+        cutoff = time.monotonic() - self.max_age
+        while self.items and self.items[0][0] < cutoff:
+            self.items.popleft()
+            self.expired += 1
+
+    def take(self):
+        self.evict_stale()
+        if self.items:
+            self.hits += 1
+            item = self.items.popleft()[1]
+        else:
+            self.misses += 1
+            item = None
+        if self._wake is not None:
+            self._wake.set()
+        return item
+
+    async def refill_one(self):
+        started = time.monotonic()
+        try:
+            item = await self.factory()
+        except Exception as e:
+            self.refill_failures += 1
+            self.consecutive_failures += 1
+            pool_logger.warning("%s pool refill failed: %s", self.name, e)
+            return
+        latency = time.monotonic() - started
+        self.items.append((time.monotonic(), item))
+        self.refills += 1
+        self.consecutive_failures = 0
+        self.last_refill_latency = latency
+        self.max_refill_latency = max(self.max_refill_latency, latency)
+        self.total_refill_latency += latency
+
+    async def run(self):
+        while True:
+            self.evict_stale()
+            deficit = self.target_size - len(self.items) - len(self._refilling)
+            slots = self.refill_concurrency - len(self._refilling)
+            for _ in range(max(0, min(deficit, slots))):
+                task = asyncio.create_task(self.refill_one())
+                self._refilling.add(task)
+                task.add_done_callback(self._on_refill_done)
+            timeout = self.refill_interval
+            if self.consecutive_failures:
+                timeout = min(300.0, self.refill_interval * (2 ** min(self.consecutive_failures, 6)))
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _on_refill_done(self, task):
+        self._refilling.discard(task)
+        if self._wake is not None and not self.consecutive_failures:
+            self._wake.set()
+
+    def start(self):
+        if self.target_size and self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        tasks = list(self._refilling)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self.items),
+            "target_size": self.target_size,
+            "max_age": self.max_age,
+            "refilling": len(self._refilling),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "refills": self.refills,
+            "refill_failures": self.refill_failures,
+            "last_refill_latency": round(self.last_refill_latency, 3),
+            "max_refill_latency": round(self.max_refill_latency, 3),
+            "avg_refill_latency": round(self.total_refill_latency / self.refills, 3) if self.refills else 0.0
+        }
+
+class PooledScraper:
+    def __init__(self, host: str, scraper):
+        self.host = host
+        self.scraper = scraper
+        self.created_at = time.monotonic()
+        self.uses = 0
+        self.healthy = True
+
+    def request(self, method: str, url: str, **kwargs):
+        try:
+            response = self.scraper.request(method, url, **kwargs)
+        except requests.RequestException:
+            self.healthy = False
+            raise
+        if response.status_code in (403, 503) and 'cloudflare' in response.headers.get('Server', '').lower():
+            self.healthy = False
+        return response
+
+    def get(self, url: str, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def clearance_expired(self) -> bool:
+        now = time.time()
+        for cookie in self.scraper.cookies:
+            if cookie.name == 'cf_clearance' and cookie.expires and cookie.expires <= now:
+                return True
+        return False
+
+    def clearance_cookies(self) -> Dict[str, str]:
+        return {cookie.name: cookie.value for cookie in self.scraper.cookies if cookie.name in CLEARANCE_COOKIES}
+
+    def reset_cookies(self):
+        for cookie in list(self.scraper.cookies):
+            if cookie.name not in CLEARANCE_COOKIES:
+                self.scraper.cookies.clear(cookie.domain, cookie.path, cookie.name)
+
+class TransportResponse:
+    def __init__(self, url: str, status_code: int, headers, content: bytes, cookies: Dict[str, str]):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.cookies = cookies
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+class UpstreamRecorder:
+    redacted_headers = ('authorization', 'cookie', 'x-xsrf-token')
+    decoded_headers = ('content-encoding', 'content-length', 'transfer-encoding')
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.recorded = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, provider: str, phase: str, method: str, url: str, request: dict, response, elapsed: float):
+        with self.lock:
+            self.recorded += 1
+            index = self.recorded
+        cookies = response.cookies.get_dict() if hasattr(response.cookies, 'get_dict') else dict(response.cookies)
+        fixture = {
+            "provider": provider,
+            "phase": phase,
+            "method": method,
+            "url": url,
+            "recorded_at": time.time(),
+            "elapsed": round(elapsed, 4),
+            "request": {
+                "headers": {name: '<redacted>' if name.lower() in self.redacted_headers else value
+                            for name, value in (request.get('headers') or {}).items()},
+                "json": request.get('json')
+            },
+            "response": {
+                "url": str(response.url),
+                "status_code": response.status_code,
+                "headers": {name: value for name, value in response.headers.items() if name.lower() not in self.decoded_headers},
+                "content_encoding": response.headers.get('content-encoding'),
+                "cookies": cookies,
+                "body": base64.b64encode(response.content).decode()
+            }
+        }
+        path = os.path.join(self.directory, f"{provider}-{phase}-{os.getpid()}-{index:06d}.json")
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(fixture, f, indent=1)
+        except OSError as e:
+            with self.lock:
+                self.errors += 1
+            upstream_logger.warning("Error writing upstream fixture %s: %s", path, e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"directory": self.directory, "recorded": self.recorded, "errors": self.errors}
+
+class ReplayTransport:
+    def __init__(self, directory: str, latency_scale: float = UPSTREAM_REPLAY_LATENCY):
+        self.directory = directory
+        self.latency_scale = latency_scale
+        self.fixtures = {}
+        self.positions = {}
+        self.served = 0
+        self.misses = 0
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.json'):
+                with open(os.path.join(directory, name), encoding='utf-8') as f:
+                    fixture = json.load(f)
+                self.fixtures.setdefault((fixture['provider'], fixture['phase']), []).append(fixture)
+
+    async def request(self, provider: str, phase: str, method: str, url: str) -> TransportResponse:
+        fixtures = self.fixtures.get((provider, phase))
+        if not fixtures:
+            self.misses += 1
+            raise LookupError(f"No recorded {provider} {phase} response in {self.directory} for {method} {url}")
+        position = self.positions.get((provider, phase), 0)
+        self.positions[(provider, phase)] = position + 1
+        fixture = fixtures[position % len(fixtures)]
+        if self.latency_scale > 0:
+            await asyncio.sleep(fixture['elapsed'] * self.latency_scale)
+        self.served += 1
+        recorded = fixture['response']
+        return TransportResponse(
+            recorded['url'],
+            recorded['status_code'],
+            requests.structures.CaseInsensitiveDict(recorded['headers']),
+            base64.b64decode(recorded['body']),
+            requests.cookies.cookiejar_from_dict(recorded['cookies'])
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "fixtures": {f"{provider}/{phase}": len(items) for (provider, phase), items in self.fixtures.items()},
+            "served": self.served,
+            "misses": self.misses
+        }
+
+class AiohttpTransport:
+    def __init__(self, limit: int = HTTP_POOL_LIMIT, limit_per_host: int = HTTP_POOL_LIMIT_PER_HOST,
+                 keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT, connect_timeout: float = HTTP_CONNECT_TIMEOUT):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.connect_timeout = connect_timeout
+        self.requests = 0
+        self.errors = 0
+        self._session = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                cookie_jar=aiohttp.DummyCookieJar(),
+                timeout=aiohttp.ClientTimeout(total=None, connect=self.connect_timeout)
+            )
+        return self._session
+
+    async def request(self, method: str, url: str, headers: Optional[dict] = None, cookies: Optional[dict] = None,
+                      json: Any = None, timeout: Optional[float] = None, allow_redirects: bool = True) -> TransportResponse:
+        headers = dict(headers or {})
+        if 'Accept-Encoding' in headers:
+            headers['Accept-Encoding'] = 'gzip, deflate, br'
+        self.requests += 1
+        try:
+            async with self.get_session().request(
+                method, url, headers=headers, cookies=cookies, json=json, allow_redirects=allow_redirects,
+                timeout=aiohttp.ClientTimeout(total=timeout, connect=self.connect_timeout)
+            ) as response:
+                content = await response.read()
+                return TransportResponse(
+                    str(response.url),
+                    response.status,
+                    response.headers,
+                    content,
+                    {name: morsel.value for name, morsel in response.cookies.items()}
+                )
+        except aiohttp.ClientError as e:
+            self.errors += 1
+            raise ConnectionError(f"{method} {url} failed: {str(e)}") from e
+
+    async def get(self, url: str, **kwargs) -> TransportResponse:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> TransportResponse:
+        return await self.request('POST', url, **kwargs)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "requests": self.requests,
+            "errors": self.errors,
+            "open": self._session is not None and not self._session.closed
+        }
+
+class ScraperPool:
+    def __init__(self, executor: UpstreamExecutor, max_idle: int = SCRAPER_POOL_SIZE,
+                 max_uses: int = SCRAPER_MAX_USES, max_age: float = SCRAPER_MAX_AGE,
+                 warm_urls: Optional[Dict[str, str]] = None, warm_size: int = SCRAPER_WARM_SIZE):
+        self.executor = executor
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.warm_urls = warm_urls or {}
+        self.warm_size = max(0, min(warm_size, max_idle))
+        self.idle = {}
+        self.clearance = {}
+        self.borrowed = 0
+        self.created = 0
+        self.reused = 0
+        self.recycled = 0
+        self.unhealthy = 0
+        self.warmed = 0
+        self.warm_failures = 0
+        self._wake = None
+        self._task = None
+
+    def is_reusable(self, pooled: PooledScraper) -> bool:
+        return (
+            pooled.healthy
+            and pooled.uses < self.max_uses
+            and time.monotonic() - pooled.created_at < self.max_age
+            and not pooled.clearance_expired()
+        )
+
+    async def acquire(self, host: str) -> PooledScraper:
+        idle = self.idle.setdefault(host, deque())
+        pooled = None
+        while idle:
+            candidate = idle.pop()
+            if self.is_reusable(candidate):
+                pooled = candidate
+                self.reused += 1
+                break
+            self.discard(candidate)
+        if self._wake is not None:
+            self._wake.set()
+        if pooled is None:
+            scraper = await self.executor.run(cloudscraper.create_scraper)
+            pooled = PooledScraper(host, scraper)
+            self.created += 1
+        pooled.uses += 1
+        self.borrowed += 1
+        return pooled
+
+    def release(self, pooled: PooledScraper):
+        self.borrowed -= 1
+        idle = self.idle.setdefault(pooled.host, deque())
+        if not pooled.healthy:
+            self.unhealthy += 1
+        else:
+            cookies = pooled.clearance_cookies()
+            if cookies:
+                self.clearance[pooled.host] = cookies
+        if not self.is_reusable(pooled) or len(idle) >= self.max_idle:
+            self.discard(pooled)
+            return
+        pooled.reset_cookies()
+        idle.append(pooled)
+
+    def discard(self, pooled: PooledScraper):
+        self.recycled += 1
+        try:
+            pooled.scraper.close()
+        except Exception:
+            pass
+        if self._wake is not None:
+            self._wake.set()
+
+    async def warm_one(self, host: str, url: str):
+        scraper = await self.executor.run(cloudscraper.create_scraper)
+        pooled = PooledScraper(host, scraper)
+        self.created += 1
+        try:
+            await self.executor.run(pooled.get, url, timeout=20)
+        except Exception as e:
+            pooled.healthy = False
+            pool_logger.warning("Warming a scraper for %s failed: %s", host, e)
+        if not pooled.healthy:
+            self.warm_failures += 1
+            try:
+                pooled.scraper.close()
+            except Exception:
+                pass
+            return
+        cookies = pooled.clearance_cookies()
+        if cookies:
+            self.clearance[host] = cookies
+        pooled.reset_cookies()
+        self.idle.setdefault(host, deque()).append(pooled)
+        self.warmed += 1
+
+    async def fill(self):
+        warming = []
+        for host, url in self.warm_urls.items():
+            deficit = self.warm_size - len(self.idle.get(host, ()))
+            warming.extend(self.warm_one(host, url) for _ in range(max(0, deficit)))
+        await asyncio.gather(*warming, return_exceptions=True)
+
+    @asynccontextmanager
+    async def borrow(self, host: str):
+        pooled = await self.acquire(host)
+        try:
+            yield pooled
+        finally:
+            self.release(pooled)
+
+    def sweep(self):
+        for idle in self.idle.values():
+            for pooled in [p for p in idle if not self.is_reusable(p)]:
+                idle.remove(pooled)
+                self.discard(pooled)
+
+    async def run(self, interval: float = 60.0):
+        while True:
+            self._wake.clear()
+            failures = self.warm_failures
+            await self.fill()
+            if self.warm_failures > failures:
+                # Upstream is refusing clearance; back off instead of refilling on every borrow.
+                await asyncio.sleep(interval)
+            else:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+            self.sweep()
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for idle in self.idle.values():
+            while idle:
+                self.discard(idle.pop())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "idle": {host: len(idle) for host, idle in self.idle.items()},
+            "borrowed": self.borrowed,
+            "created": self.created,
+            "reused": self.reused,
+            "recycled": self.recycled,
+            "unhealthy": self.unhealthy,
+            "warmed": self.warmed,
+            "warm_failures": self.warm_failures
+        }
+
+class ApiUrlCache:
+    def __init__(self, ttl: float = API_URL_TTL):
+        self.ttl = ttl
+        self.api_url = None
+        self.fetched_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.revalidations = 0
+        self._revalidation = None
+
+    def get(self) -> Optional[str]:
+        if self.api_url:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return self.api_url
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.fetched_at > self.ttl
+
+    def set(self, api_url: str):
+        self.api_url = api_url
+        self.fetched_at = time.monotonic()
+
+    def invalidate(self):
+        if self.api_url:
+            self.invalidations += 1
+        self.api_url = None
+
+    def revalidate(self, refresh):
+        if self._revalidation is None or self._revalidation.done():
+            self.revalidations += 1
+            self._revalidation = asyncio.create_task(refresh())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "api_url": self.api_url,
+            "age": round(time.monotonic() - self.fetched_at, 1) if self.api_url else None,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "revalidations": self.revalidations
+        }
+
+class SingleFlight:
+    def __init__(self, cache_ttl: float = INBOX_CACHE_TTL, max_cached: int = 4096):
+        self.cache_ttl = cache_ttl
+        self.max_cached = max_cached
+        self.in_flight = {}
+        self.cache = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+
+    async def do(self, key, func):
+        cached = self.cache.get(key)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                self.cache_hits += 1
+                return cached[1]
+            del self.cache[key]
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(func())
+            self.in_flight[key] = task
+            self.calls += 1
+            task.add_done_callback(lambda done, key=key: self._on_done(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _on_done(self, key, task):
+        self.in_flight.pop(key, None)
+        if task.cancelled() or task.exception() is not None or self.cache_ttl <= 0:
+            return
+        result = task.result()
+        if result is None:
+            return
+        if len(self.cache) >= self.max_cached:
+            now = time.monotonic()
+            for stale_key in [k for k, (expires, _) in self.cache.items() if expires <= now]:
+                del self.cache[stale_key]
+            if len(self.cache) >= self.max_cached:
+                self.cache.pop(next(iter(self.cache)))
+        self.cache[key] = (time.monotonic() + self.cache_ttl, result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cache_ttl": self.cache_ttl,
+            "in_flight": len(self.in_flight),
+            "cached": len(self.cache),
+            "upstream_calls": self.calls,
+            "coalesced": self.coalesced,
+            "cache_hits": self.cache_hits
+        }
+
+class InboxTracker:
+    def __init__(self, max_tokens: int = INBOX_TRACKER_MAX_TOKENS):
+        self.max_tokens = max_tokens
+        self.tokens = OrderedDict()
+
+    def observe(self, token: str, message_ids: list) -> Dict[str, int]:
+        seen = self.tokens.get(token)
+        if seen is None:
+            seen = self.tokens[token] = {}
+            while len(self.tokens) > self.max_tokens:
+                self.tokens.popitem(last=False)
+        else:
+            self.tokens.move_to_end(token)
+        for message_id in message_ids:
+            if message_id not in seen:
+                seen[message_id] = len(seen) + 1
+        return seen
+
+    def select(self, seen: Dict[str, int], items: list, message_ids: list, since: Optional[str],
+               timestamps: Optional[list] = None) -> list:
+        if not since:
+            return items
+        if since == LATEST_CURSOR:
+            return []
+        if since in seen:
+            floor = seen[since]
+            return [item for item, message_id in zip(items, message_ids) if seen[message_id] > floor]
+        try:
+            since_timestamp = float(since)
+        except ValueError:
+            return items
+        if timestamps is None:
+            return items
+        return [item for item, timestamp in zip(items, timestamps)
+                if isinstance(timestamp, (int, float)) and timestamp > since_timestamp]
+
+    def next_cursor(self, seen: Dict[str, int], message_ids: list, since: Optional[str]) -> Optional[str]:
+        if not message_ids:
+            return None if since == LATEST_CURSOR else since
+        return max(message_ids, key=seen.get)
+
+    def timestamp_cursor(self, token: str, cursor: Optional[str]) -> Optional[float]:
+        if not cursor or cursor == LATEST_CURSOR or cursor in self.tokens.get(token, ()):
+            return None
+        try:
+            return float(cursor)
+        except ValueError:
+            return None
+
+    def recognises(self, token: str, cursor: Optional[str]) -> bool:
+        if not cursor:
+            return False
+        if cursor == LATEST_CURSOR or cursor in self.tokens.get(token, ()):
+            return True
+        try:
+            float(cursor)
+        except ValueError:
+            return False
+        return True
+
+    def forget(self, token: str):
+        self.tokens.pop(token, None)
+
+class SessionRecord:
+    __slots__ = ('email', 'api_url', 'cookies', 'created_at', 'kind', 'recover_key')
+
+    def __init__(self, email: str, api_url: Optional[str], cookies: dict, created_at: float, kind: str,
+                 recover_key: Optional[str] = None):
+        self.email = email
+        self.api_url = api_url
+        self.cookies = cookies
+        self.created_at = created_at
+        self.kind = kind
+        self.recover_key = recover_key
+
+    @property
+    def ten_minute(self) -> bool:
+        return self.kind == 'ten_minute'
+
+class SqliteSessionBackend:
+    statements = {
+        'put': "INSERT OR REPLACE INTO sessions (store, token, email, api_url, cookies, created_at, kind, recover_key, expires_at) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        'delete': "DELETE FROM sessions WHERE store = ? AND token = ?",
+        'purge': "DELETE FROM sessions WHERE store = ? AND expires_at <= ?"
+    }
+
+    def __init__(self, path: str, batch_size: int = SESSION_DB_BATCH_SIZE, flush_interval: float = SESSION_DB_FLUSH_INTERVAL,
+                 synchronous: bool = SESSION_SHARED):
+        self.path = path
+        self.synchronous = synchronous
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.local = threading.local()
+        self.reads = 0
+        self.writes = 0
+        self.batches = 0
+        self.errors = 0
+        with self.connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (store TEXT NOT NULL, token TEXT NOT NULL, email TEXT NOT NULL, "
+                "api_url TEXT, cookies TEXT NOT NULL, created_at REAL NOT NULL, kind TEXT NOT NULL, recover_key TEXT, "
+                "expires_at REAL NOT NULL, PRIMARY KEY (store, token))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (store, expires_at)")
+        self.writer = threading.Thread(target=self.write_loop, daemon=True)
+        self.writer.start()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=SESSION_DB_BUSY_TIMEOUT)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def reader(self) -> sqlite3.Connection:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = self.connect()
+        return conn
+
+    def submit(self, statement: str, params: tuple):
+        if self.synchronous:
+            self.write(self.reader(), [(statement, params)])
+        else:
+            self.queue.put((statement, params))
+
+    def put(self, store: str, token: str, session: SessionRecord, expires_at: float):
+        self.submit('put', (store, token, session.email, session.api_url, json.dumps(session.cookies),
+                            session.created_at, session.kind, session.recover_key, expires_at))
+
+    def delete(self, store: str, token: str):
+        self.submit('delete', (store, token))
+
+    def purge(self, store: str, now: float):
+        self.submit('purge', (store, now))
+
+    def load(self, store: str, token: str) -> Optional[tuple]:
+        self.reads += 1
+        row = self.reader().execute(
+            "SELECT email, api_url, cookies, created_at, kind, recover_key, expires_at FROM sessions WHERE store = ? AND token = ?",
+            (store, token)
+        ).fetchone()
+        if row is None:
+            return None
+        email, api_url, cookies, created_at, kind, recover_key, expires_at = row
+        return SessionRecord(email, api_url, json.loads(cookies), created_at, kind, recover_key), expires_at
+
+    def write_loop(self):
+        conn = self.connect()
+        stopping = False
+        while not stopping:
+            operation = self.queue.get()
+            if operation is None:
+                break
+            batch = [operation]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    operation = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if operation is None:
+                    stopping = True
+                    break
+                batch.append(operation)
+            self.write(conn, batch)
+        conn.close()
+
+    def write(self, conn: sqlite3.Connection, batch: list):
+        try:
+            with conn:
+                for statement, params in batch:
+                    conn.execute(self.statements[statement], params)
+            self.batches += 1
+            self.writes += len(batch)
+        except sqlite3.Error as e:
+            self.errors += 1
+            session_logger.error("Error writing session batch to %s: %s", self.path, e)
+
+    def close(self):
+        self.queue.put(None)
+        self.writer.join(timeout=10)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "synchronous": self.synchronous,
+            "pending_writes": self.queue.qsize(),
+            "writes": self.writes,
+            "batches": self.batches,
+            "reads": self.reads,
+            "errors": self.errors
+        }
+
+class RedisSessionBackend:
+    def __init__(self, url: str, prefix: str = "tempmail:session"):
+        if redis is None:
+            raise RuntimeError("SESSION_BACKEND=redis requires the redis package (pip install redis)")
+        self.url = url
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+        self.reads = 0
+        self.writes = 0
+        self.errors = 0
+
+    def key(self, store: str, token: str) -> str:
+        return f"{self.prefix}:{store}:{token}"
+
+    def put(self, store: str, token: str, session: SessionRecord, expires_at: float):
+        value = json.dumps([session.email, session.api_url, session.cookies, session.created_at, session.kind,
+                            session.recover_key, expires_at])
+        try:
+            self.client.set(self.key(store, token), value, exat=int(expires_at) + 1)
+            self.writes += 1
+        except redis.RedisError as e:
+            self.errors += 1
+            session_logger.error("Error writing session to Redis: %s", e)
+
+    def delete(self, store: str, token: str):
+        try:
+            self.client.delete(self.key(store, token))
+            self.writes += 1
+        except redis.RedisError as e:
+            self.errors += 1
+            session_logger.error("Error deleting session from Redis: %s", e)
+
+    def purge(self, store: str, now: float):
+        pass
+
+    def load(self, store: str, token: str) -> Optional[tuple]:
+        self.reads += 1
+        try:
+            value = self.client.get(self.key(store, token))
+        except redis.RedisError as e:
+            self.errors += 1
+            session_logger.error("Error reading session from Redis: %s", e)
+            return None
+        if value is None:
+            return None
+        email, api_url, cookies, created_at, kind, recover_key, expires_at = json.loads(value)
+        return SessionRecord(email, api_url, cookies, created_at, kind, recover_key), expires_at
+
+    def close(self):
+        self.client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis",
+            "writes": self.writes,
+            "reads": self.reads,
+            "errors": self.errors
+        }
+
+def server_workers() -> int:
+    workers = max(WORKERS, int(os.getenv("WEB_CONCURRENCY", 1)))
+    for index, arg in enumerate(sys.argv[:-1]):
+        if arg in ('--workers', '-w') and sys.argv[index + 1].isdigit():
+            workers = max(workers, int(sys.argv[index + 1]))
+    for arg in sys.argv:
+        if arg.startswith('--workers=') and arg.split('=', 1)[1].isdigit():
+            workers = max(workers, int(arg.split('=', 1)[1]))
+    return workers
+
+def create_session_backend():
+    if SESSION_BACKEND == 'redis':
+        return RedisSessionBackend(SESSION_REDIS_URL)
+    if SESSION_BACKEND == 'sqlite':
+        return SqliteSessionBackend(SESSION_DB_PATH)
+    return None
+
+class SessionStore:
+    def __init__(self, name: str, ttl: float, capacity: int = SESSION_MAX_COUNT, on_remove=None, backend=None):
+        self.name = name
+        self.ttl = ttl
+        self.capacity = capacity
+        self.on_remove = on_remove
+        self.backend = backend
+        self.entries = OrderedDict()
+        self.expiry = []
+        self.lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
+        self.rehydrated = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    async def set(self, token: str, session, ttl: Optional[float] = None):
+        expires_at = session.created_at + (self.ttl if ttl is None else ttl)
+        self.cache(token, session, expires_at)
+        if self.backend is not None:
+            await asyncio.to_thread(self.backend.put, self.name, token, session, expires_at)
+
+    def cache(self, token: str, session, expires_at: float):
+        evicted = []
+        with self.lock:
+            self.entries[token] = (session, expires_at)
+            self.entries.move_to_end(token)
+            heapq.heappush(self.expiry, (expires_at, token))
+            while len(self.entries) > self.capacity:
+                evicted.append(self.entries.popitem(last=False)[0])
+                self.evicted += 1
+            if len(self.expiry) > 2 * len(self.entries) + 1024:
+                self.expiry = [(expires_at, token) for token, (_, expires_at) in self.entries.items()]
+                heapq.heapify(self.expiry)
+        self.removed(evicted)
+
+    def peek(self, token: str, default=None):
+        with self.lock:
+            entry = self.entries.get(token)
+        if entry is None or entry[1] <= time.time():
+            return default
+        return entry[0]
+
+    async def get(self, token: str, default=None):
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is not None:
+                if entry[1] > time.time():
+                    self.entries.move_to_end(token)
+                    return entry[0]
+                del self.entries[token]
+                self.expired += 1
+        if entry is not None:
+            self.removed([token])
+            if self.backend is not None:
+                await asyncio.to_thread(self.backend.delete, self.name, token)
+            return default
+        if self.backend is None:
+            return default
+        entry = await asyncio.to_thread(self.backend.load, self.name, token)
+        if entry is None or entry[1] <= time.time():
+            return default
+        self.rehydrated += 1
+        self.cache(token, *entry)
+        return entry[0]
+
+    async def pop(self, token: str, default=None):
+        with self.lock:
+            entry = self.entries.pop(token, None)
+        if self.backend is not None:
+            await asyncio.to_thread(self.backend.delete, self.name, token)
+        if entry is None:
+            return default
+        self.removed([token])
+        return entry[0]
+
+    async def sweep(self, now: Optional[float] = None) -> list:
+        now = time.time() if now is None else now
+        expired = []
+        with self.lock:
+            while self.expiry and self.expiry[0][0] <= now:
+                expires_at, token = heapq.heappop(self.expiry)
+                entry = self.entries.get(token)
+                if entry is not None and entry[1] == expires_at:
+                    del self.entries[token]
+                    expired.append(token)
+            self.expired += len(expired)
+        self.removed(expired)
+        if self.backend is not None:
+            await asyncio.to_thread(self.backend.purge, self.name, now)
+        return expired
+
+    def removed(self, tokens: list):
+        if self.on_remove is not None:
+            for token in tokens:
+                self.on_remove(token)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self.entries),
+            "capacity": self.capacity,
+            "ttl": self.ttl,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "rehydrated": self.rehydrated
+        }
+
+class HtmlTextExtractor(HTMLParser):
+    skipped_tags = {'script', 'style', 'template'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.skipped_tags:
+            self.skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.skipped_tags and self.skip_depth:
+            self.skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+    def unknown_decl(self, data):
+        if data.startswith('CDATA[') and not self.skip_depth:
+            self.parts.append(data[6:])
+
+def html_to_text(body: str) -> str:
+    if '<' not in body:
+        return html.unescape(body).strip()
+    try:
+        extractor = HtmlTextExtractor()
+        extractor.feed(body)
+        extractor.close()
+        return ''.join(extractor.parts).strip()
+    except Exception:
+        return BeautifulSoup(body, 'html.parser').get_text().strip()
+
+class TextCache:
+    def __init__(self, max_chars: int = EDU_BODY_CACHE_CHARS):
+        self.max_chars = max_chars
+        self.entries = OrderedDict()
+        self.chars = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def get(self, key) -> Optional[str]:
+        text = self.entries.get(key)
+        if text is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return text
+
+    def put(self, key, text: str):
+        if len(text) > self.max_chars:
+            return
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.chars -= len(previous)
+        self.entries[key] = text
+        self.chars += len(text)
+        while self.chars > self.max_chars:
+            _, evicted = self.entries.popitem(last=False)
+            self.chars -= len(evicted)
+            self.evicted += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.entries),
+            "chars": self.chars,
+            "max_chars": self.max_chars,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted
+        }
+
+class InboxWatch:
+    def __init__(self, token: str, kind: str, created_at: float, expires_at: Optional[float] = None):
+        self.token = token
+        self.kind = kind
+        self.created_at = created_at
+        self.expires_at = expires_at
+        self.subscribers = 0
+        self.cursor = None
+        self.closed = False
+        self.interval = POLL_MIN_INTERVAL
+        self.due = 0.0
+        self.polling = False
+        self.changed = asyncio.Event()
+
+    def notify(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+class RateLimiter:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class InboxWatchHub:
+    def __init__(self, check, describe, min_interval: float = POLL_MIN_INTERVAL, max_interval: float = POLL_MAX_INTERVAL,
+                 fast_window: float = POLL_FAST_WINDOW, backoff: float = POLL_BACKOFF, jitter: float = POLL_JITTER,
+                 max_rps: float = POLL_MAX_RPS):
+        self.check = check
+        self.describe = describe
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.fast_window = fast_window
+        self.backoff = backoff
+        self.jitter = jitter
+        self.rate_limiter = RateLimiter(max_rps)
+        self.watches = {}
+        self.schedule = []
+        self.in_flight = set()
+        self.polls = 0
+        self.notifications = 0
+        self.expired = 0
+        self._sequence = 0
+        self._wake = None
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self.run())
+
+    def subscribe(self, token: str, kind: str) -> InboxWatch:
+        watch = self.watches.get(token)
+        if watch is None:
+            created_at, expires_at = self.describe(token, kind)
+            watch = self.watches[token] = InboxWatch(token, kind, created_at, expires_at)
+            self.start()
+            self.enqueue(watch, self.min_interval)
+        watch.subscribers += 1
+        return watch
+
+    def unsubscribe(self, watch: InboxWatch):
+        watch.subscribers -= 1
+        if watch.subscribers <= 0 and self.watches.get(watch.token) is watch:
+            del self.watches[watch.token]
+
+    def enqueue(self, watch: InboxWatch, delay: float):
+        spread = delay * self.jitter
+        watch.due = time.monotonic() + max(0.0, delay + random.uniform(-spread, spread))
+        self._sequence += 1
+        heapq.heappush(self.schedule, (watch.due, self._sequence, watch))
+        self._wake.set()
+
+    def next_interval(self, watch: InboxWatch, changed: bool) -> float:
+        if changed or time.time() - watch.created_at < self.fast_window:
+            watch.interval = self.min_interval
+        else:
+            watch.interval = min(self.max_interval, watch.interval * self.backoff)
+        return watch.interval
+
+    async def run(self):
+        while True:
+            if not self.schedule:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            due, _, watch = self.schedule[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self.schedule)
+            if self.watches.get(watch.token) is not watch or watch.due != due or watch.polling:
+                continue
+            if watch.expires_at is not None and time.time() >= watch.expires_at:
+                self.close(watch)
+                self.expired += 1
+                continue
+            await self.rate_limiter.acquire()
+            watch.polling = True
+            task = asyncio.create_task(self.poll(watch))
+            self.in_flight.add(task)
+            task.add_done_callback(self.in_flight.discard)
+
+    def close(self, watch: InboxWatch):
+        watch.closed = True
+        if self.watches.get(watch.token) is watch:
+            del self.watches[watch.token]
+        watch.notify()
+
+    async def poll(self, watch: InboxWatch):
+        changed = False
+        try:
+            self.polls += 1
+            result = await self.check(watch.token, watch.kind, watch.cursor)
+            cursor = result.get("next_cursor")
+            if cursor != watch.cursor:
+                watch.cursor = cursor
+                changed = True
+                self.notifications += 1
+                watch.notify()
+        except HTTPException as e:
+            if e.status_code in (404, 410):
+                self.close(watch)
+                return
+        except Exception as e:
+            inbox_logger.warning("Error polling inbox for watch: %s", e)
+        finally:
+            watch.polling = False
+        if self.watches.get(watch.token) is watch:
+            self.enqueue(watch, self.next_interval(watch, changed))
+
+    async def stop(self):
+        tasks = list(self.in_flight)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        self.watches.clear()
+        self.schedule.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        intervals = [watch.interval for watch in self.watches.values()]
+        return {
+            "watched_mailboxes": len(self.watches),
+            "subscribers": sum(watch.subscribers for watch in self.watches.values()),
+            "polls_in_flight": len(self.in_flight),
+            "upstream_polls": self.polls,
+            "notifications": self.notifications,
+            "expired": self.expired,
+            "max_rps": self.rate_limiter.rate,
+            "avg_interval": round(sum(intervals) / len(intervals), 2) if intervals else None
+        }
+
+class MailProvider(ABC):
+    name = None
+    kind = None
+    session_kind = None
+    expires_after = None
+
+    def __init__(self, service):
+        self.service = service
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_failure = 0.0
+        self.last_error = None
+        self.last_latency = None
+
+    @abstractmethod
+    async def acquire(self) -> tuple:
+        """Return an unregistered (token, SessionRecord), from the warm pool when one is ready."""
+
+    @abstractmethod
+    async def register(self, token: str, session: SessionRecord, start_time: float) -> Dict[str, Any]:
+        """Store the session under its token and build the generate response."""
+
+    @abstractmethod
+    async def check(self, token: str, since: Optional[str] = None) -> Dict[str, Any]:
+        """Return the inbox for a token issued by this provider."""
+
+    @property
+    def pool(self) -> WarmPool:
+        return self.service.mailbox_pools[self.session_kind]
+
+    @property
+    def ready(self) -> bool:
+        self.pool.evict_stale()
+        return bool(self.pool.items)
+
+    def expires_at(self, session: SessionRecord) -> Optional[float]:
+        if self.expires_after is None:
+            return None
+        return session.created_at + self.expires_after
+
+    def expired(self, session: SessionRecord) -> bool:
+        expires_at = self.expires_at(session)
+        return expires_at is not None and time.time() > expires_at
+
+    @property
+    def healthy(self) -> bool:
+        if self.consecutive_failures < PROVIDER_FAILURE_THRESHOLD:
+            return True
+        return time.monotonic() - self.last_failure >= PROVIDER_COOLDOWN
+
+    def record(self, latency: float, error: Optional[Exception] = None):
+        self.last_latency = latency
+        if error is None:
+            self.successes += 1
+            self.consecutive_failures = 0
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_failure = time.monotonic()
+        self.last_error = error.detail if isinstance(error, HTTPException) else str(error)
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "healthy": self.healthy,
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_latency": round(self.last_latency, 3) if self.last_latency is not None else None,
+            "last_error": self.last_error,
+            "expires_after": self.expires_after
+        }
+
+class TempMailProvider(MailProvider):
+    kind = 'tempmail'
+
+    def __init__(self, service, ten_minute: bool = False):
+        super().__init__(service)
+        self.ten_minute = ten_minute
+        self.name = 'tempmail_10min' if ten_minute else 'tempmail'
+        self.session_kind = 'ten_minute' if ten_minute else 'regular'
+        self.expires_after = 600 if ten_minute else None
+
+    async def acquire(self) -> tuple:
+        return await self.service.acquire_temp_mail(self.ten_minute)
+
+    async def register(self, token: str, session: SessionRecord, start_time: float) -> Dict[str, Any]:
+        return await self.service.register_temp_mail(token, session, start_time)
+
+    async def check(self, token: str, since: Optional[str] = None) -> Dict[str, Any]:
+        return await self.service.check_messages(token, since)
+
+class EduMailProvider(MailProvider):
+    name = 'etempmail'
+    kind = 'edu'
+    session_kind = 'edu'
+
+    async def acquire(self) -> tuple:
+        return await self.service.acquire_edu_email()
+
+    async def register(self, token: str, session: SessionRecord, start_time: float) -> Dict[str, Any]:
+        return await self.service.register_edu_email(token, session)
+
+    async def check(self, token: str, since: Optional[str] = None) -> Dict[str, Any]:
+        return await self.service.check_edu_messages(token, since)
+
+class ProviderRegistry:
+    def __init__(self):
+        self.providers = {}
+
+    def register(self, provider: MailProvider) -> MailProvider:
+        self.providers[provider.name] = provider
+        return provider
+
+    def get(self, name: str) -> MailProvider:
+        provider = self.providers.get(name)
+        if provider is None:
+            raise HTTPException(status_code=400, detail=f"Unknown provider: {name}")
+        return provider
+
+    def for_kind(self, kind: str) -> MailProvider:
+        for provider in self.providers.values():
+            if provider.kind == kind:
+                return provider
+        raise LookupError(f"No provider registered for token kind {kind!r}")
+
+    def for_session(self, session: SessionRecord) -> MailProvider:
+        for provider in self.providers.values():
+            if provider.session_kind == session.kind:
+                return provider
+        raise LookupError(f"No provider registered for session kind {session.kind!r}")
+
+    def healthy(self, names) -> list:
+        candidates = [self.get(name) for name in dict.fromkeys(names)]
+        return [provider for provider in candidates if provider.healthy] or candidates
+
+    async def acquire(self, name: str) -> tuple:
+        provider = self.get(name)
+        started = time.perf_counter()
+        try:
+            entry = await provider.acquire()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            provider.record(time.perf_counter() - started, e)
+            raise
+        provider.record(time.perf_counter() - started)
+        return entry
+
+    async def generate(self, name: str) -> Dict[str, Any]:
+        start_time = time.time()
+        token, session = await self.acquire(name)
+        return await self.get(name).register(token, session, start_time)
+
+    def stats(self) -> dict:
+        return {name: provider.stats() for name, provider in self.providers.items()}
 
 class TempMailService:
     def __init__(self):
-        self.sessions = {}
-        self.email_sessions = {}
+        self.executor = UpstreamExecutor()
+        self.scraper_pool = ScraperPool(self.executor, warm_urls=None if UPSTREAM_REPLAY_DIR else {
+            TEMPMAIL_HOST: f'{TEMPMAIL_BASE_URL}/en/',
+            ETEMPMAIL_HOST: f'{ETEMPMAIL_BASE_URL}/'
+        })
+        self.api_url_cache = ApiUrlCache()
+        self.http_transport = AiohttpTransport() if API_TRANSPORT == 'aiohttp' else None
+        self.recorder = UpstreamRecorder(UPSTREAM_CAPTURE_DIR) if UPSTREAM_CAPTURE_DIR else None
+        self.replay = ReplayTransport(UPSTREAM_REPLAY_DIR) if UPSTREAM_REPLAY_DIR else None
+        self.transport_fallbacks = 0
+        self.inbox_flights = SingleFlight()
+        self.inbox_tracker = InboxTracker()
+        self.body_cache = TextCache()
+        self.session_backend = create_session_backend()
+        self.sessions = SessionStore('sessions', SESSION_TTL, on_remove=self.inbox_tracker.forget, backend=self.session_backend)
+        self.email_sessions = SessionStore('edu_sessions', EDU_SESSION_TTL, on_remove=self.inbox_tracker.forget,
+                                           backend=self.session_backend)
+        self.watch_hub = InboxWatchHub(self.check_token, self.session_timing)
+        self.providers = ProviderRegistry()
+        self.race_losers = set()
+        self.providers.register(TempMailProvider(self, ten_minute=False))
+        self.providers.register(TempMailProvider(self, ten_minute=True))
+        self.providers.register(EduMailProvider(self))
+        self.retry_policies = {
+            'tempmail': RetryPolicy.from_env('TEMPMAIL'),
+            'etempmail': RetryPolicy.from_env('ETEMPMAIL', base_delay=2.0)
+        }
+        self.mailbox_pools = {
+            'regular': WarmPool('regular', lambda: self.create_temp_mail(ten_minute=False), MAILBOX_POOL_SIZE, MAILBOX_POOL_MAX_AGE),
+            'ten_minute': WarmPool('ten_minute', lambda: self.create_temp_mail(ten_minute=True), TEN_MINUTE_POOL_SIZE, TEN_MINUTE_POOL_MAX_AGE),
+            'edu': WarmPool('edu', self.create_edu_email, EDU_POOL_SIZE, EDU_POOL_MAX_AGE)
+        }
+
+    async def start(self):
+        self.watch_hub.start()
+        self.scraper_pool.start()
+        for pool in self.mailbox_pools.values():
+            pool.start()
+
+    async def stop(self):
+        for task in list(self.race_losers):
+            task.cancel()
+        await asyncio.gather(*self.race_losers, return_exceptions=True)
+        await self.watch_hub.stop()
+        for pool in self.mailbox_pools.values():
+            await pool.stop()
+        await self.scraper_pool.stop()
+        if self.http_transport is not None:
+            await self.http_transport.close()
+        if self.session_backend is not None:
+            await asyncio.to_thread(self.session_backend.close)
+
+    async def upstream_request(self, provider: str, request_func, url: str, decode=None, phase: str = "request", final=None,
+                               **kwargs):
+        started = time.perf_counter()
+        outcome = {}
+        try:
+            return await self.upstream_attempts(provider, request_func, url, decode, outcome, phase, final, **kwargs)
+        finally:
+            upstream_requests_total.inc(provider, phase, str(outcome.get("status", "error")))
+            upstream_request_duration.observe(provider, phase, value=time.perf_counter() - started)
+
+    async def upstream_attempts(self, provider: str, request_func, url: str, decode, outcome: dict, phase: str, final=None,
+                                **kwargs):
+        policy = self.retry_policies[provider]
+        method = getattr(request_func, '__name__', 'request').upper()
+        async def attempt():
+            outcome.pop("status", None)
+            started = time.perf_counter()
+            if self.replay is not None:
+                response = await self.replay.request(provider, phase, method, url)
+            elif asyncio.iscoroutinefunction(request_func):
+                response = await request_func(url, timeout=policy.timeout, **kwargs)
+            else:
+                response = await self.executor.run(request_func, url, timeout=policy.timeout, **kwargs)
+            outcome["status"] = response.status_code
+            if self.recorder is not None and self.replay is None:
+                await asyncio.to_thread(self.recorder.record, provider, phase, method, url, kwargs, response,
+                                        time.perf_counter() - started)
+            if policy.is_retryable_status(response.status_code) and not (final is not None and final(response)):
+                raise UpstreamRetryError(f"{url} returned {response.status_code}", response)
+            return decode(response) if decode else response
+        try:
+            return await policy.run(attempt, description=f"{provider} {url}")
+        except UpstreamRetryError as e:
+            if e.response is None or not policy.is_retryable_status(e.response.status_code):
+                raise
+            return decode(e.response) if decode else e.response
+
+    def is_challenge(self, response) -> bool:
+        return response.status_code in (403, 503) and (
+            'cf-mitigated' in response.headers or 'cloudflare' in response.headers.get('Server', '').lower()
+        )
+
+    async def api_request(self, method: str, url: str, scraper=None, cookies: Optional[dict] = None, phase: str = "request",
+                          **kwargs) -> tuple:
+        cookies = cookies or {}
+        if self.http_transport is not None:
+            clearance = scraper.clearance_cookies() if scraper is not None else self.scraper_pool.clearance.get(TEMPMAIL_HOST, {})
+            request_func = self.http_transport.post if method == 'POST' else self.http_transport.get
+            response, data = await self.upstream_request(
+                'tempmail', request_func, url, decode=self.decode_json_response, phase=phase, final=self.is_challenge,
+                cookies={**clearance, **cookies}, **kwargs
+            )
+            if not self.is_challenge(response):
+                return response, data
+            self.transport_fallbacks += 1
+            upstream_logger.info("Challenge on %s via async transport, retrying with cloudscraper", url)
+        if scraper is not None:
+            request_func = scraper.post if method == 'POST' else scraper.get
+            return await self.upstream_request('tempmail', request_func, url, decode=self.decode_json_response, phase=phase,
+                                               cookies=cookies, **kwargs)
+        async with self.scraper_pool.borrow(TEMPMAIL_HOST) as scraper:
+            request_func = scraper.post if method == 'POST' else scraper.get
+            return await self.upstream_request('tempmail', request_func, url, decode=self.decode_json_response, phase=phase,
+                                               cookies=cookies, **kwargs)
+
+    def decode_json_response(self, response) -> tuple:
+        if response.status_code != 200:
+            return response, None
+        try:
+            return response, response.json()
+        except ValueError as e:
+            raise UpstreamResponseError(f"Undecodable JSON from {response.url}: {str(e)}", response)
         
     async def decode_api_url(self, encoded_url: str) -> Optional[str]:
         try:
@@ -40,7 +1957,7 @@ class TempMailService:
                 decoded = 'https://' + decoded.lstrip('?:/')
             return decoded
         except Exception as e:
-            print(f"[DEBUG] Error decoding API URL: {str(e)}")
+            upstream_logger.warning("Error decoding API URL: %s", e)
             return None
 
     async def decompress_response(self, response_text: str, headers: dict) -> str:
@@ -48,7 +1965,7 @@ class TempMailService:
             try:
                 return gzip.decompress(response_text.encode()).decode('utf-8')
             except Exception as e:
-                print(f"[DEBUG] Error decompressing response: {str(e)}")
+                upstream_logger.warning("Error decompressing response: %s", e)
                 return response_text
         return response_text
 
@@ -58,7 +1975,10 @@ class TempMailService:
             if not content:
                 return None
             if response.headers.get('content-encoding') == 'gzip':
-                return gzip.decompress(content).decode('utf-8')
+                try:
+                    return gzip.decompress(content).decode('utf-8')
+                except (OSError, EOFError):
+                    return content.decode('utf-8')
             elif response.headers.get('content-encoding') == 'br':
                 try:
                     return brotli.decompress(content).decode('utf-8')
@@ -80,25 +2000,65 @@ class TempMailService:
         except Exception:
             return None
 
+    def decode_edu_json(self, response):
+        if response.status_code != 200:
+            raise UpstreamResponseError(f"{response.url} returned {response.status_code}", response)
+        if not response.content:
+            return None
+        decompressed = self.decompress_edu_response(response)
+        if decompressed is None:
+            raise UpstreamResponseError(f"Undecodable body from {response.url}", response)
+        try:
+            return json.loads(decompressed)
+        except json.JSONDecodeError as e:
+            raise UpstreamResponseError(f"Undecodable JSON from {response.url}: {str(e)}", response)
+
+    async def extract_api_url(self, html_content: str) -> Optional[str]:
+        for match in API_URL_PATTERN.finditer(html_content):
+            encoded_api_url = next(group for group in match.groups() if group)
+            api_url = await self.decode_api_url(encoded_api_url)
+            if api_url:
+                return api_url
+        return None
+
+    async def extract_api_url_from_dom(self, soup: BeautifulSoup) -> Optional[str]:
+        for script in soup.find_all('script'):
+            if script.string:
+                for pattern in COMPILED_API_URL_PATTERNS:
+                    match = pattern.search(script.string)
+                    if match:
+                        api_url = await self.decode_api_url(match.group(1))
+                        if api_url:
+                            return api_url
+        return None
+
     async def extract_auth_token(self, html_content: str, cookies: dict) -> Optional[str]:
         try:
-            jwt_patterns = [
-                r'"jwt"\s*:\s*"(eyJ[A-Za-z0-9_-]+(?:\.[A-Za-z0-9_-]+)*\.[A-Za-z0-9_-]+)"',
-                r'"token"\s*:\s*"(eyJ[A-Za-z0-9_-]+(?:\.[A-Za-z0-9_-]+)*\.[A-Za-z0-9_-]+)"',
-                r'window\.token\s*=\s*[\'"]eyJ[A-Za-z0-9_-]+(?:\.[A-Za-z0-9_-]+)*\.[A-Za-z0-9_-]+[\'"]',
-                r'eyJ[A-Za-z0-9_-]+(?:\.[A-Za-z0-9_-]+)*\.[A-Za-z0-9_-]+'
-            ]
-            for pattern in jwt_patterns:
-                matches = re.findall(pattern, html_content, re.IGNORECASE)
-                for match in matches:
-                    if isinstance(match, str) and match.startswith('eyJ'):
-                        return match
+            for pattern in JWT_PATTERNS:
+                for match in pattern.finditer(html_content):
+                    token = match.group(1) if pattern.groups else match.group(0)
+                    if token.startswith('eyJ'):
+                        return token
             return None
         except Exception as e:
-            print(f"[DEBUG] Error extracting auth token: {str(e)}")
+            upstream_logger.warning("Error extracting auth token: %s", e)
+            return None
+
+    async def extract_email_from_html(self, html_content: str) -> Optional[str]:
+        try:
+            for tag in MAIL_INPUT_PATTERN.finditer(html_content):
+                value = VALUE_ATTR_PATTERN.search(tag.group(0))
+                if value and (value.group(1) or value.group(2)):
+                    return html.unescape(value.group(1) or value.group(2))
+            email_span = MAIL_SPAN_PATTERN.search(html_content)
+            if email_span and email_span.group(1).strip():
+                return html.unescape(email_span.group(1).strip())
+            return await self.extract_email_from_dom(BeautifulSoup(html_content, 'html.parser'))
+        except Exception as e:
+            upstream_logger.warning("Error extracting email from HTML: %s", e)
             return None
 
-    async def extract_email_from_html(self, soup: BeautifulSoup) -> Optional[str]:
+    async def extract_email_from_dom(self, soup: BeautifulSoup) -> Optional[str]:
         try:
             email_input = soup.find('input', {'id': 'mail'}) or soup.find('input', {'name': 'mail'})
             if email_input and email_input.get('value'):
@@ -106,247 +2066,211 @@ class TempMailService:
             email_span = soup.find('span', {'id': 'mail'})
             if email_span and email_span.get_text().strip():
                 return email_span.get_text().strip()
-            email_container = soup.find(['div', 'span'], class_=re.compile('email|mailbox|address|temp-mail', re.I))
+            email_container = soup.find(['div', 'span'], class_=EMAIL_CONTAINER_CLASS_PATTERN)
             if email_container:
-                email_pattern = r'[\w\.-]+@[\w\.-]+\.\w+'
-                match = re.search(email_pattern, email_container.get_text())
+                match = EMAIL_PATTERN.search(email_container.get_text())
                 if match:
                     return match.group()
-            email_pattern = r'[\w\.-]+@[\w\.-]+\.\w+'
             for text in soup.stripped_strings:
-                match = re.search(email_pattern, text)
+                match = EMAIL_PATTERN.search(text)
                 if match and '@' in match.group() and '.' in match.group():
                     return match.group()
             return None
         except Exception as e:
-            print(f"[DEBUG] Error extracting email from HTML: {str(e)}")
+            upstream_logger.warning("Error extracting email from HTML: %s", e)
             return None
 
     async def get_mailbox_and_token(self, api_url: str, cookies: dict, scraper, ten_minute: bool = False) -> tuple:
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36',
-                'Accept': 'application/json, text/plain, */*',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'gzip, deflate, br, zstd',
-                'Origin': 'https://temp-mail.org',
-                'Referer': 'https://temp-mail.org/en/10minutemail' if ten_minute else 'https://temp-mail.org/en/',
-                'Sec-Ch-Ua': '"Chromium";v="140", "Not=A?Brand";v="24", "Google Chrome";v="140"',
-                'Sec-Ch-Ua-Mobile': '?0',
-                'Sec-Ch-Ua-Platform': '"Windows"',
-                'Sec-Fetch-Dest': 'empty',
-                'Sec-Fetch-Mode': 'cors',
-                'Sec-Fetch-Site': 'same-site',
-                'Content-Type': 'application/json',
-                'Priority': 'u=1, i'
-            }
-            if 'XSRF-TOKEN' in cookies:
-                headers['X-XSRF-TOKEN'] = cookies['XSRF-TOKEN']
-            print(f"[DEBUG] Requesting mailbox from: {api_url}/mailbox")
-            response = scraper.post(f"{api_url}/mailbox", headers=headers, cookies=cookies, json={})
-            print(f"[DEBUG] Mailbox response status: {response.status_code}")
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-                    print(f"[DEBUG] Mailbox response: {json.dumps(data, indent=2)}")
+            headers = tempmail_api_headers(ten_minute, cookies, accept='application/json, text/plain, */*', json_body=True)
+            upstream_logger.debug("Requesting mailbox from %s/mailbox", api_url)
+            response, data = await self.api_request('POST', f"{api_url}/mailbox", scraper, cookies, phase='mailbox', headers=headers, json={})
+            upstream_logger.debug("Mailbox response status: %s", response.status_code)
+            if data is not None:
+                log_payload(upstream_logger, "Mailbox response", data)
+                email = data.get('mailbox') or data.get('email') or data.get('address')
+                jwt_token = data.get('token') or data.get('jwt') or data.get('auth_token')
+                if jwt_token and jwt_token.startswith('eyJ'):
+                    return email, jwt_token
+                else:
+                    upstream_logger.warning("No valid JWT token found in mailbox response")
+                    return email, None
+            else:
+                upstream_logger.info("Mailbox request failed with status %s, retrying with GET", response.status_code)
+                log_payload(upstream_logger, "Mailbox error response", response.text)
+                response, data = await self.api_request('GET', f"{api_url}/mailbox", scraper, cookies, phase='mailbox_get', headers=headers)
+                upstream_logger.debug("GET mailbox response status: %s", response.status_code)
+                if data is not None:
+                    log_payload(upstream_logger, "GET mailbox response", data)
                     email = data.get('mailbox') or data.get('email') or data.get('address')
                     jwt_token = data.get('token') or data.get('jwt') or data.get('auth_token')
                     if jwt_token and jwt_token.startswith('eyJ'):
                         return email, jwt_token
                     else:
-                        print(f"[DEBUG] No valid JWT token found in response")
+                        upstream_logger.warning("No valid JWT token found in GET mailbox response")
                         return email, None
-                except json.JSONDecodeError as e:
-                    print(f"[DEBUG] JSON decode error: {str(e)}")
-                    print(f"[DEBUG] Raw response: {response.text}")
-                    return None, None
-            else:
-                print(f"[DEBUG] Mailbox request failed with status: {response.status_code}")
-                print(f"[DEBUG] Response: {response.text}")
-                response = scraper.get(f"{api_url}/mailbox", headers=headers, cookies=cookies)
-                print(f"[DEBUG] GET mailbox response status: {response.status_code}")
-                if response.status_code == 200:
-                    try:
-                        data = response.json()
-                        print(f"[DEBUG] GET Mailbox response: {json.dumps(data, indent=2)}")
-                        email = data.get('mailbox') or data.get('email') or data.get('address')
-                        jwt_token = data.get('token') or data.get('jwt') or data.get('auth_token')
-                        if jwt_token and jwt_token.startswith('eyJ'):
-                            return email, jwt_token
-                        else:
-                            print(f"[DEBUG] No valid JWT token found in GET response")
-                            return email, None
-                    except json.JSONDecodeError as e:
-                        print(f"[DEBUG] GET JSON decode error: {str(e)}")
-                        print(f"[DEBUG] GET Raw response: {response.text}")
-                        return None, None
                 else:
-                    print(f"[DEBUG] GET Mailbox request also failed with status: {response.status_code}")
+                    upstream_logger.warning("GET mailbox request also failed with status %s", response.status_code)
                     return None, None
         except Exception as e:
-            print(f"[DEBUG] Exception in get_mailbox_and_token: {str(e)}")
+            upstream_logger.error("Exception in get_mailbox_and_token: %s", e)
             return None, None
 
-    async def check_inbox(self, api_url: str, auth_token: str, cookies: dict, email: str, scraper, ten_minute: bool = False) -> Optional[list]:
-        try:
-            print(f"[DEBUG] Making request to: {api_url}/messages")
-            print(f"[DEBUG] Using auth token: {auth_token[:50] if auth_token else 'None'}...")
-            print(f"[DEBUG] Using cookies: {list(cookies.keys())}")
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36',
-                'Accept': '*/*',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'gzip, deflate, br, zstd',
-                'Origin': 'https://temp-mail.org',
-                'Referer': 'https://temp-mail.org/en/10minutemail' if ten_minute else 'https://temp-mail.org/en/',
-                'Sec-Ch-Ua': '"Chromium";v="140", "Not=A?Brand";v="24", "Google Chrome";v="140"',
-                'Sec-Ch-Ua-Mobile': '?0',
-                'Sec-Ch-Ua-Platform': '"Windows"',
-                'Sec-Fetch-Dest': 'empty',
-                'Sec-Fetch-Mode': 'cors',
-                'Sec-Fetch-Site': 'same-site',
-                'Priority': 'u=1, i'
-            }
-            if auth_token:
-                headers['Authorization'] = f'Bearer {auth_token}'
-            if 'XSRF-TOKEN' in cookies:
-                headers['X-XSRF-TOKEN'] = cookies['XSRF-TOKEN']
-            response = scraper.get(f"{api_url}/messages", headers=headers, cookies=cookies)
-            print(f"[DEBUG] Response status: {response.status_code}")
-            if response.status_code == 200:
-                try:
-                    inbox_data = response.json()
-                    print(f"[DEBUG] Raw response: {json.dumps(inbox_data, indent=2)}")
-                    if 'messages' in inbox_data:
-                        messages = inbox_data['messages']
-                        print(f"[DEBUG] Messages found: {len(messages)}")
-                        if messages:
-                            print(f"[DEBUG] First message: {messages[0]}")
-                        return messages
-                    elif isinstance(inbox_data, list):
-                        messages = inbox_data
-                        print(f"[DEBUG] Messages found: {len(messages)}")
-                        return messages
-                    else:
-                        print(f"[DEBUG] No messages key found in response")
-                        return []
-                except json.JSONDecodeError as e:
-                    print(f"[DEBUG] JSON decode error: {str(e)}")
-                    print(f"[DEBUG] Raw response text: {response.text}")
-                    return None
+    async def check_inbox(self, api_url: str, auth_token: str, cookies: dict, email: str, scraper=None, ten_minute: bool = False) -> Optional[list]:
+        try:
+            inbox_logger.debug("Requesting %s/messages with cookies %s", api_url, list(cookies))
+            headers = tempmail_api_headers(ten_minute, cookies, auth_token=auth_token)
+            response, inbox_data = await self.api_request('GET', f"{api_url}/messages", scraper, cookies, phase='messages', headers=headers)
+            inbox_logger.debug("Messages response status: %s", response.status_code)
+            if inbox_data is not None:
+                log_payload(inbox_logger, "Messages response", inbox_data)
+                if 'messages' in inbox_data:
+                    messages = inbox_data['messages']
+                    inbox_logger.debug("Messages found: %d", len(messages))
+                    return messages
+                elif isinstance(inbox_data, list):
+                    messages = inbox_data
+                    inbox_logger.debug("Messages found: %d", len(messages))
+                    return messages
+                else:
+                    inbox_logger.warning("No messages key found in messages response")
+                    return []
             else:
-                print(f"[DEBUG] Response status: {response.status_code}")
-                print(f"[DEBUG] Response headers: {dict(response.headers)}")
-                print(f"[DEBUG] Raw response: {response.text[:500]}")
+                inbox_logger.warning("Messages request failed with status %s", response.status_code)
+                log_payload(inbox_logger, "Messages error response", response.text)
                 return None
         except Exception as e:
-            print(f"[DEBUG] Exception in check_inbox: {str(e)}")
+            inbox_logger.error("Exception in check_inbox: %s", e)
             return None
 
-    async def generate_temp_mail(self, ten_minute: bool = False) -> Dict[str, Any]:
-        start_time = time.time()
-        scraper = cloudscraper.create_scraper()
-        try:
-            url = 'https://temp-mail.org/en/10minutemail' if ten_minute else 'https://temp-mail.org/en/'
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'gzip, deflate, br, zstd',
-                'Sec-Ch-Ua': '"Chromium";v="140", "Not=A?Brand";v="24", "Google Chrome";v="140"',
-                'Sec-Ch-Ua-Mobile': '?0',
-                'Sec-Ch-Ua-Platform': '"Windows"',
-                'Sec-Fetch-Dest': 'document',
-                'Sec-Fetch-Mode': 'navigate',
-                'Sec-Fetch-Site': 'none',
-                'Sec-Fetch-User': '?1',
-                'Upgrade-Insecure-Requests': '1',
-                'Priority': 'u=0, i'
-            }
-            response = scraper.get(url, headers=headers, allow_redirects=True)
-            print(f"[DEBUG] Response status for {url}: {response.status_code}")
-            if response.status_code != 200:
-                raise HTTPException(status_code=500, detail=f"Failed to connect to {url}")
-            html_content = await self.decompress_response(response.text, response.headers)
-            cookies = dict(response.cookies)
-            print(f"[DEBUG] Captured cookies: {cookies}")
-            soup = BeautifulSoup(html_content, 'html.parser')
-            api_url = None
-            scripts = soup.find_all('script')
-            for script in scripts:
-                if script.string:
-                    script_content = script.string
-                    api_patterns = [
-                        r"var api_url\s*=\s*'([^']+)'",
-                        r'"api_url"\s*:\s*"([^"]+)"',
-                        r'apiUrl\s*:\s*[\'"]([^\'"]+)[\'"]',
-                        r'API_URL\s*=\s*[\'"]([^\'"]+)[\'"]'
-                    ]
-                    for pattern in api_patterns:
-                        match = re.search(pattern, script_content)
-                        if match:
-                            encoded_api_url = match.group(1)
-                            api_url = await self.decode_api_url(encoded_api_url)
-                            if api_url:
-                                print(f"[DEBUG] Captured API URL: {api_url}")
-                                break
-                    if api_url:
-                        break
-            if not api_url:
-                api_url = "https://web2.temp-mail.org"
-                print(f"[DEBUG] Using default API URL: {api_url}")
+    async def fetch_landing_page(self, scraper, ten_minute: bool = False) -> tuple:
+        url = f'{TEMPMAIL_BASE_URL}/en/10minutemail' if ten_minute else f'{TEMPMAIL_BASE_URL}/en/'
+        headers = tempmail_page_headers()
+        response = await self.upstream_request('tempmail', scraper.get, url, phase='landing_page', headers=headers, allow_redirects=True)
+        upstream_logger.debug("Landing page %s returned %s", url, response.status_code)
+        if response.status_code != 200:
+            raise HTTPException(status_code=500, detail=f"Failed to connect to {url}")
+        html_content = await self.decompress_response(response.text, response.headers)
+        cookies = dict(response.cookies)
+        upstream_logger.debug("Captured cookies: %s", list(cookies))
+        api_url = await self.extract_api_url(html_content)
+        if not api_url:
+            api_url = await self.extract_api_url_from_dom(BeautifulSoup(html_content, 'html.parser'))
+        if api_url:
+            upstream_logger.debug("Captured API URL: %s", api_url)
+            self.api_url_cache.set(api_url)
+        else:
+            api_url = "https://web2.temp-mail.org"
+            upstream_logger.warning("API URL not found on landing page, using default %s", api_url)
+        return api_url, cookies, html_content
+
+    async def revalidate_api_url(self):
+        try:
+            async with self.scraper_pool.borrow(TEMPMAIL_HOST) as scraper:
+                await self.fetch_landing_page(scraper)
+        except Exception as e:
+            upstream_logger.warning("Error revalidating API URL: %s", e)
+
+    async def create_temp_mail(self, ten_minute: bool = False) -> tuple:
+        scraper = None
+        try:
+            scraper = await self.scraper_pool.acquire(TEMPMAIL_HOST)
+            api_url = self.api_url_cache.get()
+            if api_url:
+                if self.api_url_cache.is_stale():
+                    self.api_url_cache.revalidate(self.revalidate_api_url)
+                cookies = scraper.clearance_cookies()
+                email, auth_token = await self.get_mailbox_and_token(api_url, cookies, scraper, ten_minute)
+                if email and auth_token:
+                    return auth_token, SessionRecord(email, api_url, cookies, time.time(), 'ten_minute' if ten_minute else 'regular')
+                upstream_logger.info("Cached API URL %s failed, refetching landing page", api_url)
+                self.api_url_cache.invalidate()
+            api_url, cookies, html_content = await self.fetch_landing_page(scraper, ten_minute)
             email, auth_token = await self.get_mailbox_and_token(api_url, cookies, scraper, ten_minute)
             if not email or not auth_token:
-                print("[DEBUG] Failed to get email/token from API, trying HTML extraction...")
-                email = await self.extract_email_from_html(soup)
+                upstream_logger.info("Failed to get email/token from API, trying HTML extraction")
+                email = await self.extract_email_from_html(html_content)
                 if not auth_token:
                     auth_token = await self.extract_auth_token(html_content, cookies)
             if not email or not auth_token:
                 raise HTTPException(status_code=500, detail="Failed to generate temporary email")
-            session_data = {
-                'api_url': api_url,
-                'email': email,
-                'cookies': cookies,
-                'scraper': scraper,
-                'created_at': time.time(),
-                'ten_minute': ten_minute
-            }
-            self.sessions[auth_token] = session_data
-            time_taken = f"{time.time() - start_time:.2f}s"
-            return {
-                "api_owner": "@ISmartCoder",
-                "api_dev": "@WeSmartDevelopers",
-                "temp_mail": email,
-                "access_token": auth_token,
-                "time_taken": time_taken,
-                "expires_at": (datetime.now() + timedelta(minutes=10)).strftime('%Y-%m-%d %H:%M:%S') if ten_minute else "N/A"
-            }
+            return auth_token, SessionRecord(email, api_url, cookies, time.time(), 'ten_minute' if ten_minute else 'regular')
+        except HTTPException:
+            raise
         except Exception as e:
-            print(f"[DEBUG] Error in generate_temp_mail: {str(e)}")
+            upstream_logger.error("Error in create_temp_mail: %s", e)
             raise HTTPException(status_code=500, detail=f"Error generating temp mail: {str(e)}")
         finally:
-            pass
+            if scraper is not None:
+                self.scraper_pool.release(scraper)
+
+    async def acquire_temp_mail(self, ten_minute: bool = False) -> tuple:
+        try:
+            entry = self.mailbox_pools['ten_minute' if ten_minute else 'regular'].take()
+            if entry is None:
+                entry = await self.create_temp_mail(ten_minute)
+            return entry
+        except HTTPException:
+            raise
+        except Exception as e:
+            api_logger.error("Error in generate_temp_mail: %s", e)
+            raise HTTPException(status_code=500, detail=f"Error generating temp mail: {str(e)}")
+
+    async def register_temp_mail(self, auth_token: str, session: SessionRecord, start_time: float) -> Dict[str, Any]:
+        await self.sessions.set(auth_token, session, TEN_MINUTE_SESSION_TTL if session.ten_minute else None)
+        time_taken = f"{time.time() - start_time:.2f}s"
+        expires_at = datetime.fromtimestamp(session.created_at) + timedelta(minutes=10)
+        return {
+            "api_owner": "@ISmartCoder",
+            "api_dev": "@WeSmartDevelopers",
+            "temp_mail": session.email,
+            "access_token": auth_token,
+            "time_taken": time_taken,
+            "expires_at": expires_at.strftime('%Y-%m-%d %H:%M:%S') if session.ten_minute else "N/A"
+        }
 
-    async def check_messages(self, token: str) -> Dict[str, Any]:
-        if token not in self.sessions:
+    async def generate_temp_mail(self, ten_minute: bool = False) -> Dict[str, Any]:
+        start_time = time.time()
+        auth_token, session = await self.acquire_temp_mail(ten_minute)
+        return await self.register_temp_mail(auth_token, session, start_time)
+
+    def message_id(self, message: dict) -> str:
+        message_id = message.get('_id') or message.get('id')
+        if message_id:
+            return str(message_id)
+        return hashlib.sha1(json.dumps(message, sort_keys=True, default=str).encode()).hexdigest()
+
+    def edu_message_id(self, mail: dict) -> str:
+        key = '\x1f'.join(str(mail.get(field, '')) for field in ('from', 'subject', 'date', 'body'))
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    async def check_messages(self, token: str, since: Optional[str] = None) -> Dict[str, Any]:
+        session = await self.sessions.get(token)
+        if session is None:
             raise HTTPException(status_code=404, detail="Invalid or expired token")
-        session = self.sessions[token]
-        if session['ten_minute'] and (time.time() - session['created_at']) > 600:
-            del self.sessions[token]
+        if self.providers.for_session(session).expired(session):
+            await self.sessions.pop(token)
             raise HTTPException(status_code=410, detail="10-minute email has expired")
         try:
-            messages = await self.check_inbox(
-                session['api_url'],
+            messages = await self.inbox_flights.do(('tempmail', token), lambda: self.check_inbox(
+                session.api_url,
                 token,
-                session['cookies'],
-                session['email'],
-                session['scraper'],
-                session['ten_minute']
-            )
+                session.cookies,
+                session.email,
+                None,
+                session.ten_minute
+            ))
             if messages is None:
                 raise HTTPException(status_code=500, detail="Failed to check inbox")
+            message_ids = [self.message_id(message) for message in messages]
+            timestamps = [message.get('receivedAt') for message in messages]
+            arrival_order = sorted(
+                range(len(messages)),
+                key=lambda i: timestamps[i] if isinstance(timestamps[i], (int, float)) else 0
+            )
+            seen = self.inbox_tracker.observe(token, [message_ids[i] for i in arrival_order])
             enhanced_messages = []
-            for message in messages:
+            for message in self.inbox_tracker.select(seen, messages, message_ids, since, timestamps):
                 enhanced_message = message.copy()
                 enhanced_message["api_dev"] = "@ISmartCoder"
                 enhanced_message["api_updates"] = "@WeSmartDevelopers"
@@ -359,132 +2283,274 @@ class TempMailService:
                         pass
                 enhanced_messages.append(enhanced_message)
             return {
-                "mailbox": session['email'],
+                "mailbox": session.email,
                 "messages": enhanced_messages,
+                "next_cursor": self.inbox_tracker.next_cursor(seen, message_ids, since),
                 "api_owner": "@ISmartCoder",
                 "api_dev": "@WeSmartDevelopers"
             }
         except Exception as e:
-            print(f"[DEBUG] Error in check_messages: {str(e)}")
+            inbox_logger.error("Error in check_messages: %s", e)
             raise HTTPException(status_code=500, detail=f"Error checking messages: {str(e)}")
 
+    async def check_token(self, token: str, kind: str, since: Optional[str] = None) -> Dict[str, Any]:
+        return await self.providers.for_kind(kind).check(token, since)
+
+    async def wait_for_messages(self, token: str, kind: str, since: Optional[str] = None,
+                                timeout: float = LONG_POLL_DEFAULT_TIMEOUT) -> Dict[str, Any]:
+        timeout = max(0.0, min(timeout, LONG_POLL_MAX_TIMEOUT))
+        tracked = token in self.inbox_tracker.tokens
+        baseline = not since or (tracked and not self.inbox_tracker.recognises(token, since))
+        result = await self.check_token(token, kind, LATEST_CURSOR if baseline else since)
+        if not baseline and not self.inbox_tracker.recognises(token, since):
+            result = await self.check_token(token, kind, LATEST_CURSOR)
+        if result["messages"] or timeout == 0:
+            result["timed_out"] = False
+            return result
+        cursor = result["next_cursor"]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        watch = self.watch_hub.subscribe(token, kind)
+        try:
+            changed = watch.changed
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                changed = watch.changed
+                result = await self.check_token(token, kind, cursor)
+                if result["messages"]:
+                    result["timed_out"] = False
+                    return result
+                cursor = result["next_cursor"]
+        finally:
+            self.watch_hub.unsubscribe(watch)
+        result["timed_out"] = True
+        return result
+
+    def session_timing(self, token: str, kind: str) -> tuple:
+        session = self.email_sessions.peek(token) if kind == 'edu' else self.sessions.peek(token)
+        if session is None:
+            return time.time(), None
+        return session.created_at, self.providers.for_session(session).expires_at(session)
+
+    async def token_kind(self, token: str) -> str:
+        if await self.sessions.get(token) is not None:
+            return 'tempmail'
+        if await self.email_sessions.get(token) is not None:
+            return 'edu'
+        raise HTTPException(status_code=404, detail="Invalid or expired token")
+
+    async def stream_messages(self, token: str, kind: str, since: Optional[str] = None):
+        watch = self.watch_hub.subscribe(token, kind)
+        try:
+            changed = watch.changed
+            cursor = since
+            while True:
+                try:
+                    result = await self.check_token(token, kind, cursor)
+                except HTTPException as e:
+                    if e.status_code in (404, 410):
+                        yield "closed", {"access_token": token, "status": e.status_code, "detail": e.detail}
+                        return
+                    raise
+                if result["messages"]:
+                    yield "messages", result
+                cursor = result["next_cursor"]
+                while True:
+                    try:
+                        await asyncio.wait_for(changed.wait(), timeout=STREAM_HEARTBEAT_INTERVAL)
+                        break
+                    except asyncio.TimeoutError:
+                        yield "heartbeat", {"timestamp": int(time.time())}
+                changed = watch.changed
+        finally:
+            self.watch_hub.unsubscribe(watch)
+
     async def get_edu_email(self):
-        url = "https://etempmail.com/getEmailAddress"
-        headers = {
-            'accept': '*/*',
-            'accept-encoding': 'gzip, deflate, br',
-            'accept-language': 'en-US,en;q=0.6',
-            'origin': 'https://etempmail.com',
-            'referer': 'https://etempmail.com/',
-            'sec-ch-ua': '"Chromium";v="140", "Not=A?Brand";v="24", "Brave";v="140"',
-            'sec-ch-ua-mobile': '?0',
-            'sec-ch-ua-platform': '"Windows"',
-            'sec-fetch-dest': 'empty',
-            'sec-fetch-mode': 'cors',
-            'sec-fetch-site': 'same-origin',
-            'sec-gpc': '1',
-            'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36',
-            'x-requested-with': 'XMLHttpRequest'
-        }
-        scraper = cloudscraper.create_scraper()
-        for attempt in range(3):
+        url = f"{ETEMPMAIL_BASE_URL}/getEmailAddress"
+        headers = etempmail_headers()
+        def parse(response):
+            data = self.decode_edu_json(response)
             try:
-                response = scraper.post(url, headers=headers)
-                if response.status_code == 200:
-                    decompressed = self.decompress_edu_response(response)
-                    if not decompressed:
-                        if attempt < 2:
-                            time.sleep(2)
-                            continue
-                        return None, None, None
-                    try:
-                        data = json.loads(decompressed)
-                        return data['address'], data['recover_key'], response.cookies.get_dict()
-                    except json.JSONDecodeError:
-                        if attempt < 2:
-                            time.sleep(2)
-                            continue
-                        return None, None, None
-                else:
-                    if attempt < 2:
-                        time.sleep(2)
-                        continue
-                    return None, None, None
-            except Exception:
-                if attempt < 2:
-                    time.sleep(2)
-                    continue
-                return None, None, None
-        return None, None, None
+                return data['address'], data['recover_key'], response.cookies.get_dict()
+            except (KeyError, TypeError) as e:
+                raise UpstreamResponseError(f"Incomplete getEmailAddress response: {str(e)}", response)
+        try:
+            async with self.scraper_pool.borrow(ETEMPMAIL_HOST) as scraper:
+                return await self.upstream_request('etempmail', scraper.post, url, decode=parse, phase='get_email_address', headers=headers)
+        except Exception as e:
+            upstream_logger.error("Error in get_edu_email: %s", e)
+            return None, None, None
 
     async def check_edu_inbox(self, email, cookies):
-        url = "https://etempmail.com/getInbox"
-        headers = {
-            'accept': '*/*',
-            'accept-encoding': 'gzip, deflate, br',
-            'accept-language': 'en-US,en;q=0.6',
-            'origin': 'https://etempmail.com',
-            'referer': 'https://etempmail.com/',
-            'sec-ch-ua': '"Chromium";v="140", "Not=A?Brand";v="24", "Brave";v="140"',
-            'sec-ch-ua-mobile': '?0',
-            'sec-ch-ua-platform': '"Windows"',
-            'sec-fetch-dest': 'empty',
-            'sec-fetch-mode': 'cors',
-            'sec-fetch-site': 'same-origin',
-            'sec-gpc': '1',
-            'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36',
-            'x-requested-with': 'XMLHttpRequest'
-        }
-        scraper = cloudscraper.create_scraper()
+        url = f"{ETEMPMAIL_BASE_URL}/getInbox"
+        headers = etempmail_headers()
         try:
-            response = scraper.post(url, headers=headers, cookies=cookies)
-            if response.status_code == 200:
-                decompressed = self.decompress_edu_response(response)
-                if decompressed is None:
-                    return []
-                try:
-                    data = json.loads(decompressed)
-                    return data
-                except json.JSONDecodeError:
-                    return []
-            else:
-                return []
-        except Exception:
-            return []
+            async with self.scraper_pool.borrow(ETEMPMAIL_HOST) as scraper:
+                inbox = await self.upstream_request('etempmail', scraper.post, url, decode=self.decode_edu_json, phase='get_inbox',
+                                                    headers=headers, cookies=cookies)
+        except Exception as e:
+            inbox_logger.error("Error in check_edu_inbox: %s", e)
+            return None
+        return [] if inbox is None else inbox
 
-    async def generate_edu_email(self):
+    async def create_edu_email(self) -> SessionRecord:
+        email, recover_key, cookies = await self.get_edu_email()
+        if not email:
+            raise HTTPException(status_code=500, detail="Failed to generate email")
+        return SessionRecord(email, None, cookies, time.time(), 'edu', recover_key)
+
+    async def acquire_edu_email(self) -> tuple:
         try:
-            email, recover_key, cookies = await self.get_edu_email()
-            if not email:
-                raise HTTPException(status_code=500, detail="Failed to generate email")
-            access_token = str(uuid.uuid4())
-            self.email_sessions[access_token] = {
-                "email": email,
-                "recover_key": recover_key,
-                "cookies": cookies,
-                "created_at": time.time()
-            }
-            return {
-                "api_owner": "@ISmartCoder",
-                "api_dev": "@TheSmartDev",
-                "edu_mail": email,
-                "access_token": access_token
-            }
+            session = self.mailbox_pools['edu'].take()
+            if session is None:
+                session = await self.create_edu_email()
+            return str(uuid.uuid4()), session
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
-    async def check_edu_messages(self, token: str):
+    async def register_edu_email(self, access_token: str, session: SessionRecord) -> Dict[str, Any]:
+        await self.email_sessions.set(access_token, session)
+        return {
+            "api_owner": "@ISmartCoder",
+            "api_dev": "@TheSmartDev",
+            "edu_mail": session.email,
+            "access_token": access_token
+        }
+
+    async def generate_edu_email(self):
+        access_token, session = await self.acquire_edu_email()
+        return await self.register_edu_email(access_token, session)
+
+    async def generate_batch(self, generate, count: int) -> Dict[str, Any]:
+        start_time = time.time()
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        async def generate_one():
+            async with semaphore:
+                return await generate()
+        outcomes = await asyncio.gather(*(generate_one() for _ in range(count)), return_exceptions=True)
+        results = []
+        errors = []
+        for index, outcome in enumerate(outcomes):
+            if isinstance(outcome, HTTPException):
+                errors.append({"index": index, "status_code": outcome.status_code, "detail": outcome.detail})
+            elif isinstance(outcome, Exception):
+                errors.append({"index": index, "status_code": 500, "detail": str(outcome)})
+            else:
+                results.append(outcome)
+        return {
+            "api_owner": "@ISmartCoder",
+            "api_dev": "@WeSmartDevelopers",
+            "requested": count,
+            "generated": len(results),
+            "failed": len(errors),
+            "results": results,
+            "errors": errors,
+            "time_taken": f"{time.time() - start_time:.2f}s"
+        }
+
+    def settle_race_loser(self, task: asyncio.Task, provider: MailProvider, started: float):
+        loop = asyncio.get_running_loop()
+        def expire():
+            if not task.done():
+                task.cancel()
+                provider.record(PROVIDER_RACE_WINDOW, TimeoutError(f"No mailbox within the {PROVIDER_RACE_WINDOW:g}s race window"))
+        handle = loop.call_at(started + PROVIDER_RACE_WINDOW, expire)
+        self.race_losers.add(task)
+        def settled(done):
+            handle.cancel()
+            self.race_losers.discard(done)
+            if not done.cancelled():
+                done.exception()
+        task.add_done_callback(settled)
+
+    async def race_generate(self, names: list) -> Dict[str, Any]:
+        start_time = time.time()
+        started = asyncio.get_running_loop().time()
+        providers = self.providers.healthy(names)
+        ready = next((provider for provider in providers if provider.ready), None)
+        if ready is not None:
+            providers = [ready]
+        tasks = {asyncio.ensure_future(self.providers.acquire(provider.name)): provider for provider in providers}
+        errors = []
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    provider = tasks[task]
+                    error = task.exception()
+                    if error is None:
+                        api_logger.info("Provider race won by %s after %.2fs", provider.name, time.time() - start_time)
+                        token, session = task.result()
+                        return {
+                            **await provider.register(token, session, start_time),
+                            "provider": provider.name,
+                            "check_url": "/api/edu/chk" if provider.kind == 'edu' else "/api/chk",
+                            "time_taken": f"{time.time() - start_time:.2f}s"
+                        }
+                    detail = error.detail if isinstance(error, HTTPException) else str(error)
+                    errors.append(f"{provider.name}: {detail}")
+        finally:
+            for task, provider in tasks.items():
+                if not task.done():
+                    self.settle_race_loser(task, provider, started)
+                elif not task.cancelled():
+                    task.exception()
+        raise HTTPException(status_code=502, detail=f"All providers failed ({'; '.join(errors)})")
+
+    async def check_batch(self, tokens: list, since: Optional[Dict[str, str]] = None):
+        since = since or {}
+        semaphore = asyncio.Semaphore(BATCH_CHECK_CONCURRENCY)
+        async def check_one(token: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    result = await self.check_token(token, await self.token_kind(token), since.get(token))
+                    return {"token": token, "status_code": 200, "result": result}
+                except HTTPException as e:
+                    return {"token": token, "status_code": e.status_code, "detail": e.detail}
+                except Exception as e:
+                    return {"token": token, "status_code": 500, "detail": str(e)}
+        tasks = [asyncio.ensure_future(check_one(token)) for token in dict.fromkeys(tokens)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def edu_body_text(self, token: str, message_id: str, body: str) -> str:
+        key = (token, message_id)
+        text = self.body_cache.get(key)
+        if text is None:
+            text = html_to_text(body)
+            self.body_cache.put(key, text)
+        return text
+
+    async def check_edu_messages(self, token: str, since: Optional[str] = None):
         try:
-            if token not in self.email_sessions:
+            session = await self.email_sessions.get(token)
+            if session is None:
                 raise HTTPException(status_code=404, detail="Invalid or expired token")
-            session = self.email_sessions[token]
-            email = session["email"]
-            cookies = session["cookies"]
-            inbox = await self.check_edu_inbox(email, cookies)
+            if self.inbox_tracker.timestamp_cursor(token, since) is not None:
+                raise HTTPException(status_code=400, detail="Edu inboxes only accept a message id cursor")
+            email = session.email
+            cookies = session.cookies
+            inbox = await self.inbox_flights.do(('edu', token), lambda: self.check_edu_inbox(email, cookies))
+            if inbox is None:
+                raise HTTPException(status_code=500, detail="Failed to check inbox")
+            message_ids = [self.edu_message_id(mail) for mail in inbox]
+            seen = self.inbox_tracker.observe(token, message_ids[::-1])
             messages = []
-            for mail in inbox:
-                soup = BeautifulSoup(mail['body'], 'html.parser')
-                body_text = soup.get_text().strip()
+            for mail, message_id in self.inbox_tracker.select(seen, list(zip(inbox, message_ids)), message_ids, since):
+                body_text = self.edu_body_text(token, message_id, mail['body'])
                 messages.append({
                     "From": mail['from'],
                     "Subject": mail['subject'],
@@ -497,7 +2563,8 @@ class TempMailService:
                 "api_dev": "@TheSmartDev",
                 "edu_mail": email,
                 "access_token": token,
-                "messages": messages
+                "messages": messages,
+                "next_cursor": self.inbox_tracker.next_cursor(seen, message_ids, since)
             }
             if messages:
                 latest_message = messages[0]
@@ -517,10 +2584,60 @@ class TempMailService:
                     "Subject": ""
                 })
             return response_data
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
 temp_mail_service = TempMailService()
+metrics.gauge(
+    "tempmail_sessions", "Sessions held in memory, by store", ("store",),
+    lambda: {("sessions",): len(temp_mail_service.sessions), ("edu_sessions",): len(temp_mail_service.email_sessions)}
+)
+metrics.gauge(
+    "tempmail_executor_tasks", "Blocking upstream calls queued for or running on the executor", ("state",),
+    lambda: {("queued",): temp_mail_service.executor.queued, ("in_flight",): temp_mail_service.executor.in_flight}
+)
+metrics.gauge(
+    "tempmail_pool_ready", "Pre-generated mailboxes ready to hand out, by pool", ("pool",),
+    lambda: {(name,): len(pool.items) for name, pool in temp_mail_service.mailbox_pools.items()}
+)
+metrics.gauge(
+    "tempmail_watched_mailboxes", "Mailboxes polled for waiting or streaming clients", (),
+    lambda: {(): len(temp_mail_service.watch_hub.watches)}
+)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    if not METRICS_ENABLED:
+        return await call_next(request)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        http_requests_total.inc(request.method, path, str(status))
+        http_request_duration.observe(request.method, path, value=time.perf_counter() - started)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+class BatchGenerateRequest(BaseModel):
+    count: int = Field(1, ge=1, le=BATCH_MAX_COUNT)
+
+class BatchCheckRequest(BaseModel):
+    tokens: List[str] = Field(..., min_length=1, max_length=BATCH_CHECK_MAX_TOKENS)
+    since: Optional[Dict[str, str]] = None
+
+def batch_response(result: Dict[str, Any]) -> JSONResponse:
+    return JSONResponse(content=result, status_code=200 if result["generated"] else 502)
 
 @app.get("/")
 async def root():
@@ -532,79 +2649,206 @@ async def root():
 @app.get("/api/gen")
 async def generate_mail():
     try:
-        result = await temp_mail_service.generate_temp_mail(ten_minute=False)
+        result = await temp_mail_service.providers.generate('tempmail')
         return JSONResponse(content=result)
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"[DEBUG] Error in /api/gen: {str(e)}")
+        api_logger.error("Error in /api/gen: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/chk")
-async def check_mail(token: str):
+async def check_mail(token: str, since: Optional[str] = None):
     try:
-        result = await temp_mail_service.check_messages(token)
+        result = await temp_mail_service.check_messages(token, since)
         return JSONResponse(content=result)
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"[DEBUG] Error in /api/chk: {str(e)}")
+        api_logger.error("Error in /api/chk: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/10min/gen")
 async def generate_10min_mail():
     try:
-        result = await temp_mail_service.generate_temp_mail(ten_minute=True)
+        result = await temp_mail_service.providers.generate('tempmail_10min')
         return JSONResponse(content=result)
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"[DEBUG] Error in /api/10min/gen: {str(e)}")
+        api_logger.error("Error in /api/10min/gen: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/10min/chk")
-async def check_10min_mail(token: str):
+async def check_10min_mail(token: str, since: Optional[str] = None):
     try:
-        result = await temp_mail_service.check_messages(token)
+        result = await temp_mail_service.check_messages(token, since)
         return JSONResponse(content=result)
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"[DEBUG] Error in /api/10min/chk: {str(e)}")
+        api_logger.error("Error in /api/10min/chk: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/edu/gen")
 async def generate_edu_email():
     try:
-        result = await temp_mail_service.generate_edu_email()
+        result = await temp_mail_service.providers.generate('etempmail')
         return JSONResponse(content=result)
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"[DEBUG] Error in /api/edu/gen: {str(e)}")
+        api_logger.error("Error in /api/edu/gen: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/edu/chk")
-async def check_edu_messages(token: str):
+async def check_edu_messages(token: str, since: Optional[str] = None):
+    try:
+        result = await temp_mail_service.check_edu_messages(token, since)
+        return JSONResponse(content=result)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        api_logger.error("Error in /api/edu/chk: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/gen/race")
+async def generate_race_mail(providers: str = RACE_PROVIDERS):
+    try:
+        names = [name.strip() for name in providers.split(',') if name.strip()]
+        if not names:
+            raise HTTPException(status_code=400, detail="No providers given")
+        result = await temp_mail_service.race_generate(names)
+        return JSONResponse(content=result)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        api_logger.error("Error in /api/gen/race: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/gen/batch")
+async def generate_mail_batch(request: BatchGenerateRequest):
+    result = await temp_mail_service.generate_batch(
+        lambda: temp_mail_service.providers.generate('tempmail'), request.count
+    )
+    return batch_response(result)
+
+@app.post("/api/10min/gen/batch")
+async def generate_10min_mail_batch(request: BatchGenerateRequest):
+    result = await temp_mail_service.generate_batch(
+        lambda: temp_mail_service.providers.generate('tempmail_10min'), request.count
+    )
+    return batch_response(result)
+
+@app.post("/api/edu/gen/batch")
+async def generate_edu_mail_batch(request: BatchGenerateRequest):
+    result = await temp_mail_service.generate_batch(
+        lambda: temp_mail_service.providers.generate('etempmail'), request.count
+    )
+    return batch_response(result)
+
+@app.post("/api/chk/batch")
+async def check_mail_batch(request: BatchCheckRequest):
+    async def lines():
+        async for item in temp_mail_service.check_batch(request.tokens, request.since):
+            yield json.dumps(item) + "\n"
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/api/chk/wait")
+async def wait_mail(token: str, timeout: float = LONG_POLL_DEFAULT_TIMEOUT, since: Optional[str] = None):
+    try:
+        result = await temp_mail_service.wait_for_messages(token, 'tempmail', since, timeout)
+        return JSONResponse(content=result)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        api_logger.error("Error in /api/chk/wait: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/10min/chk/wait")
+async def wait_10min_mail(token: str, timeout: float = LONG_POLL_DEFAULT_TIMEOUT, since: Optional[str] = None):
     try:
-        result = await temp_mail_service.check_edu_messages(token)
+        result = await temp_mail_service.wait_for_messages(token, 'tempmail', since, timeout)
         return JSONResponse(content=result)
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"[DEBUG] Error in /api/edu/chk: {str(e)}")
+        api_logger.error("Error in /api/10min/chk/wait: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-def cleanup_expired_sessions():
+@app.get("/api/edu/chk/wait")
+async def wait_edu_messages(token: str, timeout: float = LONG_POLL_DEFAULT_TIMEOUT, since: Optional[str] = None):
+    try:
+        result = await temp_mail_service.wait_for_messages(token, 'edu', since, timeout)
+        return JSONResponse(content=result)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        api_logger.error("Error in /api/edu/chk/wait: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/stream")
+async def stream_mail(token: str, since: Optional[str] = None):
+    kind = await temp_mail_service.token_kind(token)
+    async def events():
+        async for event, data in temp_mail_service.stream_messages(token, kind, since):
+            if event == "heartbeat":
+                yield ": heartbeat\n\n"
+            else:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/api/ws")
+async def websocket_mail(websocket: WebSocket, token: str, since: Optional[str] = None):
+    try:
+        kind = await temp_mail_service.token_kind(token)
+    except HTTPException:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+    try:
+        async for event, data in temp_mail_service.stream_messages(token, kind, since):
+            await websocket.send_json({"event": event, "data": data})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        api_logger.error("Error in /api/ws: %s", e)
+        await websocket.close(code=1011)
+
+@app.get("/api/stats")
+async def service_stats():
+    return JSONResponse(content={
+        "executor": temp_mail_service.executor.stats(),
+        "pools": {name: pool.stats() for name, pool in temp_mail_service.mailbox_pools.items()},
+        "scrapers": temp_mail_service.scraper_pool.stats(),
+        "api_url_cache": temp_mail_service.api_url_cache.stats(),
+        "inbox_coalescing": temp_mail_service.inbox_flights.stats(),
+        "edu_body_cache": temp_mail_service.body_cache.stats(),
+        "watches": temp_mail_service.watch_hub.stats(),
+        "providers": temp_mail_service.providers.stats(),
+        "transport": {
+            "api": API_TRANSPORT,
+            "http": temp_mail_service.http_transport.stats() if temp_mail_service.http_transport else None,
+            "cloudscraper_fallbacks": temp_mail_service.transport_fallbacks
+        },
+        "sessions": temp_mail_service.sessions.stats(),
+        "edu_sessions": temp_mail_service.email_sessions.stats(),
+        "session_db": temp_mail_service.session_backend.stats() if temp_mail_service.session_backend else None,
+        "capture": temp_mail_service.recorder.stats() if temp_mail_service.recorder else None,
+        "replay": temp_mail_service.replay.stats() if temp_mail_service.replay else None,
+        "worker": {"pid": os.getpid(), "workers": WORKERS, "shared_sessions": SESSION_SHARED}
+    })
+
+async def cleanup_expired_sessions():
     while True:
-        current_time = time.time()
-        expired_tokens = []
-        for token, session in temp_mail_service.email_sessions.items():
-            if current_time - session["created_at"] > 7200:
-                expired_tokens.append(token)
-        for token in expired_tokens:
-            del temp_mail_service.email_sessions[token]
-        time.sleep(300)
+        await temp_mail_service.sessions.sweep()
+        await temp_mail_service.email_sessions.sweep()
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
 
 def get_local_ip():
     try:
@@ -628,12 +2872,25 @@ if __name__ == "__main__":
     print(f"Check 10-Minute Messages: http://{local_ip}:{port}/api/10min/chk?token=YOUR_TOKEN")
     print(f"Generate Edu Mail: http://{local_ip}:{port}/api/edu/gen")
     print(f"Check Edu Messages: http://{local_ip}:{port}/api/edu/chk?token=YOUR_TOKEN")
-    cleanup_thread = threading.Thread(target=cleanup_expired_sessions, daemon=True)
-    cleanup_thread.start()
-    uvicorn.run(
-        app,
-        host="0.0.0.0",
-        port=port,
-        reload=False,
-        access_log=True
-    )
\ No newline at end of file
+    if WORKERS > 1:
+        if SESSION_BACKEND == 'memory':
+            os.environ["SESSION_DB_PATH"] = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.db")
+            print(f"No session backend configured, sharing sessions through {os.environ['SESSION_DB_PATH']}")
+        print(f"Workers: {WORKERS}")
+        uvicorn.run(
+            "main:app",
+            app_dir=os.path.dirname(os.path.abspath(__file__)),
+            host="0.0.0.0",
+            port=port,
+            workers=WORKERS,
+            reload=False,
+            access_log=True
+        )
+    else:
+        uvicorn.run(
+            app,
+            host="0.0.0.0",
+            port=port,
+            reload=False,
+            access_log=True
+        )
\ No newline at end of file
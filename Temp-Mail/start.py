@@ -23,13 +23,14 @@ class ServiceManager:
         self.processes = {}
         self.running = True
         
-    def start_service(self, name, command, shell=False):
+    def start_service(self, name, command, shell=False, env=None):
         """Start a service in a subprocess"""
         try:
             print(f"🚀 Starting {name}...")
             process = subprocess.Popen(
                 command,
                 shell=shell,
+                env=env,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
                 text=True,
@@ -96,7 +97,7 @@ class ServiceManager:
         
         print("🌟 Smart TempMail - Service Manager")
         print("=" * 50)
-        print(f"📡 API Server: {'Enabled' if api_enabled else 'Disabled'}")
+        print(f"📡 API Server: {'Enabled' if api_enabled else 'Disabled'} ({os.getenv('WORKERS', '1')} worker(s))")
         print(f"🤖 Telegram Bot: {'Enabled' if bot_enabled else 'Disabled'}")
         print(f"❤️  Keep-Alive: {'Enabled' if keep_alive_enabled else 'Disabled'}")
         print("=" * 50)
@@ -105,7 +106,9 @@ class ServiceManager:
         threads = []
         
         if api_enabled:
-            api_process = self.start_service("API", [sys.executable, "main.py"])
+            # The bot owns the keep-alive server when both run, so only one process binds its port
+            api_env = dict(os.environ, ENABLE_KEEP_ALIVE='false') if bot_enabled else None
+            api_process = self.start_service("API", [sys.executable, "main.py"], env=api_env)
             if api_process:
                 thread = Thread(target=self.monitor_process, args=("API", api_process), daemon=True)
                 thread.start()
@@ -173,6 +176,7 @@ Options:
   --api-only     Run only the API server
   --bot-only     Run only the Telegram bot
   --with-keepalive  Enable keep-alive server (for hosting platforms)
+  --workers N    Run the API server with N worker processes sharing sessions
 
 Environment Variables:
   ENABLE_API=true/false        Enable/disable API server (default: true)
@@ -181,6 +185,7 @@ Environment Variables:
   BOT_TOKEN=your_token         Your Telegram bot token
   API_URL=http://localhost:8000 API URL for bot to connect to
   PORT=8000                    API server port
+  WORKERS=1                    API worker processes (sessions shared via SESSION_DB_PATH or SESSION_REDIS_URL)
   KEEP_ALIVE_PORT=8080         Keep-alive server port
 
 Examples:
@@ -188,6 +193,7 @@ Examples:
   python start.py --api-only         # Run only API server
   python start.py --bot-only         # Run only Telegram bot
   python start.py --with-keepalive   # Run with keep-alive server
+  python start.py --api-only --workers 4  # Run API server on 4 worker processes
 
 Developer: @ISmartCoder
 Updates: @WeSmartDevelopers
@@ -213,6 +219,13 @@ if __name__ == "__main__":
     if '--with-keepalive' in args:
         os.environ['ENABLE_KEEP_ALIVE'] = 'true'
     
+    if '--workers' in args:
+        index = args.index('--workers')
+        if index + 1 >= len(args) or not args[index + 1].isdigit() or int(args[index + 1]) < 1:
+            print("❌ --workers requires a positive number, e.g. --workers 4")
+            sys.exit(1)
+        os.environ['WORKERS'] = args[index + 1]
+    
     # Check if required environment variables are set
     if os.getenv('ENABLE_BOT', 'true').lower() == 'true' and not os.getenv('BOT_TOKEN'):
         print("❌ BOT_TOKEN environment variable is required when bot is enabled")